@@ -1,197 +1,158 @@
-import json
-import os
 import hashlib
 import secrets
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from typing import Dict, Any
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    '''
-    Business: Аутентификация и регистрация игроков
-    Args: event - dict с httpMethod, body (email, password, username для регистрации)
-    Returns: HTTP response с токеном или ошибкой
-    '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
-    if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'})
-        }
-    
-    body_data = json.loads(event.get('body', '{}'))
-    action = body_data.get('action')
-    
-    database_url = os.environ.get('DATABASE_URL')
-    
-    try:
-        conn = psycopg2.connect(database_url)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if action == 'register':
-            email = body_data.get('email', '').strip().lower()
-            password = body_data.get('password', '')
-            username = body_data.get('username', '').strip()
-            
-            if not email or not password or not username:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Email, password и username обязательны'})
-                }
-            
-            if len(username) < 3 or len(username) > 50:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Никнейм должен быть от 3 до 50 символов'})
-                }
-            
-            if len(password) < 6:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Пароль должен быть минимум 6 символов'})
-                }
-            
-            cur.execute("SELECT id FROM players WHERE email = %s", (email,))
-            if cur.fetchone():
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Email уже используется'})
-                }
-            
-            cur.execute("SELECT id FROM players WHERE username = %s", (username,))
-            if cur.fetchone():
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Никнейм уже занят'})
-                }
-            
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            
-            cur.execute(
-                """INSERT INTO players (email, username, password_hash, tokens, rating, created_at, last_active)
+from shared.achievements import achievement_catalogue, counter_columns
+from shared.http import Request, Router, error_response, json_response
+from shared import tokens
+from shared.sessions import sessions
+
+router = Router()
+
+
+@router.route('POST', 'register')
+def register(request: Request) -> Dict[str, Any]:
+    body_data = request.body
+    email = body_data.get('email', '').strip().lower()
+    password = body_data.get('password', '')
+    username = body_data.get('username', '').strip()
+
+    if not email or not password or not username:
+        return error_response(400, 'Email, password и username обязательны')
+
+    if len(username) < 3 or len(username) > 50:
+        return error_response(400, 'Никнейм должен быть от 3 до 50 символов')
+
+    if len(password) < 6:
+        return error_response(400, 'Пароль должен быть минимум 6 символов')
+
+    password_hash = hashlib.sha256(password.encode()).hexdigest()
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.now() + timedelta(days=30)
+    store_session = not tokens.signing_enabled()
+
+    conn = request.conn
+    catalogue = achievement_catalogue.get(conn)
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""WITH new_player AS (
+                   INSERT INTO players AS p (email, username, password_hash, tokens, rating, created_at, last_active)
                    VALUES (%s, %s, %s, 350, 1000, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                   RETURNING id""",
-                (email, username, password_hash)
-            )
-            player_id = cur.fetchone()['id']
-            
-            cur.execute("SELECT id FROM achievements")
-            achievements = cur.fetchall()
-            for achievement in achievements:
-                cur.execute(
-                    "INSERT INTO player_achievements (player_id, achievement_id, progress) VALUES (%s, %s, 0)",
-                    (player_id, achievement['id'])
-                )
-            
-            token = secrets.token_urlsafe(32)
-            expires_at = datetime.now() + timedelta(days=30)
-            
-            cur.execute(
-                "INSERT INTO sessions (player_id, token, expires_at) VALUES (%s, %s, %s)",
-                (player_id, token, expires_at)
-            )
-            
-            conn.commit()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'token': token,
-                    'playerId': player_id,
-                    'username': username,
-                    'email': email
-                })
-            }
-        
-        elif action == 'login':
-            email = body_data.get('email', '').strip().lower()
-            password = body_data.get('password', '')
-            
-            if not email or not password:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Email и password обязательны'})
-                }
-            
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            
+                   ON CONFLICT DO NOTHING
+                   RETURNING {counter_columns('p')}
+               ), seeded AS (
+                   {catalogue.upsert('new_player')}
+               ), untracked AS (
+                   {catalogue.seed('new_player')}
+               ), new_session AS (
+                   INSERT INTO sessions (player_id, token, expires_at)
+                   SELECT id, %s, %s FROM new_player WHERE %s
+               )
+               SELECT id FROM new_player""",
+            (email, username, password_hash, token, expires_at, store_session)
+        )
+        created = cur.fetchone()
+
+        if not created:
             cur.execute(
-                "SELECT id, username, email FROM players WHERE email = %s AND password_hash = %s",
-                (email, password_hash)
+                "SELECT email = %s FROM players WHERE email = %s OR username = %s ORDER BY 1 DESC LIMIT 1",
+                (email, email, username)
             )
-            player = cur.fetchone()
-            
-            if not player:
-                return {
-                    'statusCode': 401,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Неверный email или пароль'})
-                }
-            
+            conflict = cur.fetchone()
+            email_taken = not conflict or conflict[0]
+            return error_response(400, 'Email уже используется' if email_taken else 'Никнейм уже занят')
+
+    player_id = created[0]
+
+    if not store_session:
+        token, expires_at = tokens.issue(player_id)
+
+    conn.commit()
+
+    return json_response(200, {
+        'token': token,
+        'playerId': player_id,
+        'username': username,
+        'email': email
+    })
+
+
+@router.route('POST', 'login')
+def login(request: Request) -> Dict[str, Any]:
+    body_data = request.body
+    email = body_data.get('email', '').strip().lower()
+    password = body_data.get('password', '')
+
+    if not email or not password:
+        return error_response(400, 'Email и password обязательны')
+
+    password_hash = hashlib.sha256(password.encode()).hexdigest()
+
+    conn = request.conn
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, username, email FROM players WHERE email = %s AND password_hash = %s",
+            (email, password_hash)
+        )
+        player = cur.fetchone()
+
+        if not player:
+            return error_response(401, 'Неверный email или пароль')
+
+        player_id, username, email = player
+
+        if tokens.signing_enabled():
+            token, expires_at = tokens.issue(player_id)
+        else:
             token = secrets.token_urlsafe(32)
             expires_at = datetime.now() + timedelta(days=30)
-            
+
             cur.execute(
                 "INSERT INTO sessions (player_id, token, expires_at) VALUES (%s, %s, %s)",
-                (player['id'], token, expires_at)
-            )
-            
-            cur.execute(
-                "UPDATE players SET last_active = CURRENT_TIMESTAMP WHERE id = %s",
-                (player['id'],)
+                (player_id, token, expires_at)
             )
-            
-            conn.commit()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'token': token,
-                    'playerId': player['id'],
-                    'username': player['username'],
-                    'email': player['email']
-                })
-            }
-        
-        else:
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Неизвестное действие'})
-            }
-    
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)})
-        }
-    
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
+
+        cur.execute(
+            "UPDATE players SET last_active = CURRENT_TIMESTAMP WHERE id = %s",
+            (player_id,)
+        )
+
+    conn.commit()
+
+    return json_response(200, {
+        'token': token,
+        'playerId': player_id,
+        'username': username,
+        'email': email
+    })
+
+
+@router.route('POST', 'logout')
+def logout(request: Request) -> Dict[str, Any]:
+    token = request.token or request.body.get('token')
+
+    if not token:
+        return error_response(401, 'Требуется аутентификация')
+
+    conn = request.conn
+    if tokens.is_signed(token):
+        claims = tokens.verify(token)
+        if claims:
+            tokens.revocations.revoke(conn, claims.jti, datetime.fromtimestamp(claims.expires_at))
+    else:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE token = %s", (token,))
+        sessions.revoke(conn, token)
+    conn.commit()
+
+    return json_response(200, {'success': True})
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Аутентификация и регистрация игроков
+    Args: event - dict с httpMethod, headers (X-Auth-Token для выхода), body (email, password, username для регистрации)
+    Returns: HTTP response с токеном или ошибкой
+    '''
+    return router.dispatch(event, context)
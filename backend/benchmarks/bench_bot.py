@@ -0,0 +1,64 @@
+'''
+Business: Скорость поиска бота (узлы/сек) и задержка выбора хода по уровням сложности
+Args: --positions N --seed N
+Returns: Для каждого уровня: средняя глубина, узлы/сек, p50/p95/max задержки в мс
+
+Run from backend/: python benchmarks/bench_bot.py --positions 20
+Positions come from random playouts of the initial board with random dice.
+'''
+
+import argparse
+import os
+import random
+import statistics
+import sys
+from typing import List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stats import percentile
+from shared.bot import DIFFICULTY_LIMITS, TranspositionTable, choose_move
+from shared.engine import ALL_TYPES, BLACK, KING, PIECE_TYPES, TYPE_MASK, WHITE, Board
+
+
+def random_positions(count: int, seed: int) -> List[Tuple[Board, int, List[str]]]:
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board.initial()
+        color = WHITE
+        for _ in range(rng.randint(0, 40)):
+            moves = board.moves(color, ALL_TYPES)
+            if not moves or board.make(rng.choice(moves)) & TYPE_MASK == KING:
+                break
+            color ^= BLACK
+        else:
+            positions.append((board, color, [rng.choice(PIECE_TYPES) for _ in range(3)]))
+    return positions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--positions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    positions = random_positions(args.positions, args.seed)
+
+    print(f"{'difficulty':<12}{'depth':>7}{'nodes/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for difficulty in DIFFICULTY_LIMITS:
+        table = TranspositionTable()
+        latencies, depths, nodes, seconds = [], [], 0, 0.0
+        for board, color, dice in positions:
+            result = choose_move(board, color, dice, difficulty, table, random.Random(0))
+            latencies.append(result.elapsed * 1000)
+            depths.append(result.depth)
+            nodes += result.nodes
+            seconds += result.elapsed
+        print(
+            f'{difficulty:<12}{statistics.mean(depths):>7.1f}{nodes / seconds:>12,.0f}'
+            f'{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}{max(latencies):>10.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
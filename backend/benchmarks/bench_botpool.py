@@ -0,0 +1,50 @@
+'''
+Business: Пропускная способность пакетного сервиса ходов бота в зависимости от числа процессов
+Args: --batch N --difficulty medium --deadline SEC --workers 1,2,4
+Returns: Позиций/сек, p50/p95 ожидания в очереди, число отменённых задач
+
+Run from backend/: python benchmarks/bench_botpool.py --batch 64 --difficulty medium
+'''
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_bot import random_positions
+from shared.botpool import BotJob, BotService, BotServiceStats, encode_position
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch', type=int, default=64)
+    parser.add_argument('--difficulty', default='medium')
+    parser.add_argument('--deadline', type=float, default=2.0)
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({1, os.cpu_count() or 1})))
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    positions = [encode_position(board, color, dice) for board, color, dice in random_positions(args.batch, args.seed)]
+
+    print(f"{'workers':>8}{'pos/s':>10}{'wait p50 ms':>14}{'wait p95 ms':>14}{'cancelled':>11}")
+    for workers in (int(n) for n in args.workers.split(',')):
+        service = BotService(workers)
+        try:
+            service.run_batch([BotJob(0, positions[0], args.difficulty, time.time() + 10)])
+            service.stats = BotServiceStats()
+            deadline = time.time() + args.deadline
+            service.run_batch([
+                BotJob(game_id, packed, args.difficulty, deadline) for game_id, packed in enumerate(positions)
+            ])
+            summary = service.stats.summary()
+        finally:
+            service.shutdown()
+        print(
+            f"{workers:>8}{summary['positions_per_sec']:>10.1f}{summary['queue_wait_p50_ms']:>14.1f}"
+            f"{summary['queue_wait_p95_ms']:>14.1f}{summary['cancelled']:>11}"
+        )
+
+
+if __name__ == '__main__':
+    main()
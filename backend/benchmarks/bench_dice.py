@@ -0,0 +1,85 @@
+'''
+Business: Ускорение раскрытия узлов случая при переборе 56 мультимножеств вместо 216 бросков
+Args: --positions N --depth N --seed N
+Returns: Время раскрытия узла случая для обеих таблиц и проверка равенства оценок
+
+Run from backend/: python benchmarks/bench_dice.py --depth 2
+The transposition table is disabled so repeated multisets in the ordered
+table are really searched again, as in any search or hint code that does
+not cache by dice.
+'''
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.bot import Searcher, TranspositionTable, evaluate, position_hash
+from shared.dice import CHANCE_OUTCOMES
+from shared.engine import ALL_TYPES, BLACK, KING, TYPE_MASK, WHITE, Board
+
+ORDERED_OUTCOMES: List[Tuple[Tuple[int, ...], float]] = []
+for faces in itertools.product(range(1, 7), repeat=3):
+    counts = [0] * 7
+    for face in faces:
+        counts[face] += 1
+    ORDERED_OUTCOMES.append((tuple(counts), 1 / 216))
+
+
+class NoTable(TranspositionTable):
+    def get(self, key: int, depth: int) -> None:
+        return None
+
+    def put(self, key: int, depth: int, value: float) -> None:
+        pass
+
+
+def random_positions(count: int, seed: int) -> List[Tuple[Board, int]]:
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board.initial()
+        color = WHITE
+        for _ in range(rng.randint(4, 30)):
+            moves = board.moves(color, ALL_TYPES)
+            if not moves or board.make(rng.choice(moves)) & TYPE_MASK == KING:
+                break
+            color ^= BLACK
+        else:
+            positions.append((board, color))
+    return positions
+
+
+def expand(positions: List[Tuple[Board, int]], outcomes, depth: int) -> Tuple[float, List[float]]:
+    values = []
+    started = time.perf_counter()
+    for board, color in positions:
+        searcher = Searcher(board, NoTable(), outcomes)
+        values.append(searcher.chance(color, depth, evaluate(board), position_hash(board)))
+    return time.perf_counter() - started, values
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--positions', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    positions = random_positions(args.positions, args.seed)
+    ordered_s, ordered_values = expand(positions, ORDERED_OUTCOMES, args.depth)
+    table_s, table_values = expand(positions, CHANCE_OUTCOMES, args.depth)
+
+    drift = max(abs(a - b) for a, b in zip(ordered_values, table_values))
+    per_node = 1000 / len(positions)
+    print(f'216 ordered rolls : {ordered_s * per_node:8.2f} ms per chance node')
+    print(f'56 multisets      : {table_s * per_node:8.2f} ms per chance node')
+    print(f'speedup {ordered_s / table_s:.1f}x, max value drift {drift:.2e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+'''
+Business: Пропускная способность и отказоустойчивость клиента YooKassa на локальной заглушке
+Args: --requests N
+Returns: Запросов/сек с keep-alive и без него, поведение при таймаутах, ошибках и сбоях
+
+Run from backend/: python benchmarks/bench_gateway.py --requests 300
+Runs fully offline against benchmarks/yookassa_stub.py.
+'''
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.yookassa_stub import YooKassaStub
+from shared.gateway import CircuitBreaker, CircuitOpenError, GatewayError, PaymentGateway
+
+PAYLOAD = {'amount': {'value': '100.00', 'currency': 'RUB'}, 'capture': True}
+
+
+def throughput(requests_count: int) -> None:
+    import requests
+
+    with YooKassaStub() as stub:
+        gateway = PaymentGateway(stub.url)
+        started = time.perf_counter()
+        for _ in range(requests_count):
+            gateway.create_payment(PAYLOAD, str(uuid.uuid4()))
+        pooled = requests_count / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(requests_count):
+            requests.post(f'{stub.url}/payments', json=PAYLOAD, auth=('shop', 'secret'),
+                          headers={'Idempotence-Key': str(uuid.uuid4())}, timeout=10)
+        fresh = requests_count / (time.perf_counter() - started)
+
+    print(f'throughput: keep-alive session {pooled:8.0f} req/s, new connection per call {fresh:8.0f} req/s')
+
+
+def failure_modes() -> None:
+    with YooKassaStub(mode='slow', delay=1.0) as stub:
+        gateway = PaymentGateway(stub.url, read_timeout=0.2, retries=0)
+        started = time.perf_counter()
+        try:
+            gateway.create_payment(PAYLOAD, 'slow-1')
+        except GatewayError:
+            pass
+        print(f'slow upstream: gave up after {time.perf_counter() - started:.2f}s (read timeout 0.2s)')
+
+    with YooKassaStub(mode='flaky') as stub:
+        gateway = PaymentGateway(stub.url, retries=2)
+        gateway.create_payment(PAYLOAD, 'flaky-1')
+        print(f'flaky upstream: succeeded after {len(stub.keys)} attempts, keys reused: {set(stub.keys) == {"flaky-1"}}')
+
+    with YooKassaStub(mode='error') as stub:
+        gateway = PaymentGateway(stub.url, retries=0, breaker=CircuitBreaker(failures=3, reset_after=60))
+        outcomes = []
+        for i in range(6):
+            started = time.perf_counter()
+            try:
+                gateway.create_payment(PAYLOAD, f'error-{i}')
+            except CircuitOpenError:
+                outcomes.append(f'open {1000 * (time.perf_counter() - started):.2f}ms')
+            except GatewayError:
+                outcomes.append('failed')
+        print(f'failing upstream: {", ".join(outcomes)}; upstream saw {len(stub.keys)} requests')
+
+    with YooKassaStub(mode='garbage') as stub:
+        breaker = CircuitBreaker(failures=1, reset_after=0)
+        gateway = PaymentGateway(stub.url, retries=0, breaker=breaker)
+        outcomes = []
+        for i in range(3):
+            try:
+                gateway.create_payment(PAYLOAD, f'garbage-{i}')
+            except GatewayError as e:
+                outcomes.append(f'{type(e).__name__}: {e}')
+        print(f'non-JSON 201: {outcomes[-1]}; {len(stub.keys)} half-open trials reached upstream')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.setdefault('YOOKASSA_SHOP_ID', 'shop')
+    os.environ.setdefault('YOOKASSA_SECRET_KEY', 'secret')
+    throughput(args.requests)
+    failure_modes()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+'''
+Business: Накладные расходы обработчика на запрос до и после перехода на shared.http
+Args: --iterations N
+Returns: Микросекунды на запрос для OPTIONS, ошибок, неизвестного действия и сериализации профиля
+
+Run from backend/: python benchmarks/bench_handlers.py
+The "before" side is the inline code the handlers used to carry: header dicts
+built per return, json.dumps at every return site and a RealDictCursor row
+copied into a camelCase dict by hand. No database is needed; the profile row
+is a constant shaped like the one the player function fetches.
+'''
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.http import Router, RowMapper, error_response, json_response
+
+PROFILE_ROW = {
+    'id': 42, 'username': 'DiceMaster', 'email': 'dice@example.ru', 'rating': 1234,
+    'total_games': 87, 'wins': 51, 'losses': 30, 'draws': 6, 'win_rate': Decimal('58.6'),
+    'tokens': 350, 'best_win_streak': 7, 'current_streak': 2, 'tokens_won': 900, 'tokens_lost': 450,
+}
+PROFILE_TUPLE = tuple(float(v) if isinstance(v, Decimal) else v for v in PROFILE_ROW.values())
+
+
+def legacy_dispatch(event: Dict[str, Any]) -> Dict[str, Any]:
+    method = event.get('httpMethod', 'GET')
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, PUT, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
+                'Access-Control-Max-Age': '86400'
+            },
+            'body': ''
+        }
+    if method not in ('GET', 'PUT', 'POST'):
+        return {
+            'statusCode': 405,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Method not allowed'})
+        }
+    headers = event.get('headers', {})
+    token = headers.get('X-Auth-Token') or headers.get('x-auth-token')
+    if not token:
+        return {
+            'statusCode': 401,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Требуется аутентификация'})
+        }
+    body_data = json.loads(event.get('body', '{}'))
+    if body_data.get('action') == 'noop':
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'success': True})
+        }
+    return {
+        'statusCode': 400,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'error': 'Неизвестное действие'})
+    }
+
+
+def legacy_profile(row: Dict[str, Any]) -> Dict[str, Any]:
+    player = dict(row)
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({
+            'id': player['id'],
+            'username': player['username'],
+            'email': player['email'],
+            'rating': player['rating'],
+            'totalGames': player['total_games'],
+            'wins': player['wins'],
+            'losses': player['losses'],
+            'draws': player['draws'],
+            'winRate': float(player['win_rate']),
+            'tokens': player['tokens'],
+            'bestWinStreak': player['best_win_streak'],
+            'currentStreak': player['current_streak'],
+            'tokensWon': player['tokens_won'],
+            'tokensLost': player['tokens_lost'],
+            'rank': 17
+        })
+    }
+
+
+def build_router() -> Router:
+    router = Router()
+
+    @router.route('GET', auth=True)
+    def get_profile(request: Any) -> Dict[str, Any]:
+        return error_response(404, 'Игрок не найден')
+
+    @router.route('POST', 'noop')
+    def noop(request: Any) -> Dict[str, Any]:
+        return json_response(200, {'success': True})
+
+    return router
+
+
+def per_call_us(run: Callable[[], Any], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200_000)
+    args = parser.parse_args()
+
+    router = build_router()
+    profile = RowMapper([(key, key) for key in (
+        'id', 'username', 'email', 'rating', 'totalGames', 'wins', 'losses', 'draws',
+        'winRate', 'tokens', 'bestWinStreak', 'currentStreak', 'tokensWon', 'tokensLost',
+    )])
+
+    def mapped_profile() -> Dict[str, Any]:
+        player = profile.one(PROFILE_TUPLE)
+        player['rank'] = 17
+        return json_response(200, player)
+
+    cases = [
+        ('OPTIONS preflight', {'httpMethod': 'OPTIONS'}),
+        ('405 method', {'httpMethod': 'DELETE'}),
+        ('401 no token', {'httpMethod': 'GET', 'headers': {}}),
+        ('400 unknown action', {'httpMethod': 'POST', 'headers': {'X-Auth-Token': 't'}, 'body': '{"action": "nope"}'}),
+    ]
+
+    print(f"json backend: {'orjson' if importlib.util.find_spec('orjson') else 'json'}")
+    print(f"{'case':<22}{'before us':>12}{'after us':>12}{'speedup':>10}")
+    for name, event in cases:
+        before = per_call_us(lambda: legacy_dispatch(event), args.iterations)
+        after = per_call_us(lambda: router.dispatch(event, None), args.iterations)
+        print(f'{name:<22}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x')
+
+    before = per_call_us(lambda: legacy_profile(PROFILE_ROW), args.iterations)
+    after = per_call_us(mapped_profile, args.iterations)
+    print(f"{'profile 200':<22}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+    assert json.loads(legacy_profile(PROFILE_ROW)['body']) == json.loads(mapped_profile()['body'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+'''
+Business: Пропускная способность подбора соперников при 10k игроков в очереди
+Args: --queued 10000 --pairings N --database (замер записи пар в games), DATABASE_URL в окружении для --database
+Returns: Пар в секунду для SortedList-очереди и для линейного поиска, время sweep, строк в секунду при записи пачками
+
+Run from backend/: python benchmarks/bench_matchmaking.py [--database]
+The standing queue is spread MATCH_WINDOW_BASE + 1 rating points apart so it
+never pairs with itself; the cost of a join depends on the queue size, not on
+the rating values. Each measured step is one join that pairs with a queued
+player plus one join that refills the queue, so the size stays at --queued.
+The linear baseline scans the same waiting list per join, which is the best
+case for polling games WHERE status = 'waiting' without the round trip.
+--database writes the matches into a temporary games table that shadows the
+real one for the session, once with MATCH_BATCH_SIZE rows per INSERT, as a
+sweep does, and once row by row, as each pairing join does.
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.matchmaking import MATCH_BATCH_SIZE, MATCH_WINDOW_BASE, Match, MatchmakingService, Opening, Ticket, acceptable, insert_games
+from shared.relay import GameRoom
+
+KEY = ('5+3', 10)
+SPACING = MATCH_WINDOW_BASE + 1
+
+
+def standing_queue(size: int) -> MatchmakingService:
+    service = MatchmakingService()
+    for player_id in range(size):
+        service.join(player_id, player_id * SPACING, KEY, now=0.0)
+    assert len(service.waiting) == size
+    return service
+
+
+def bench_sorted(size: int, pairings: int, seed: int = 1) -> List[Match]:
+    service = standing_queue(size)
+    rng = random.Random(seed)
+    next_id = size
+    matches = []
+    started = time.perf_counter()
+    for _ in range(pairings):
+        rating = rng.randrange(size) * SPACING
+        match = service.join(next_id, rating + 1, KEY, now=0.0)
+        assert match is not None
+        matches.append(match)
+        service.join(next_id + 1, rating, KEY, now=0.0)
+        next_id += 2
+    elapsed = time.perf_counter() - started
+    print(f'{"sorted queue":<16}{pairings / elapsed:>14,.0f} pairs/s{elapsed / pairings * 1e6:>10.1f} us/pair')
+    return matches
+
+
+def bench_linear(size: int, pairings: int, seed: int = 1) -> None:
+    waiting: List[Ticket] = [Ticket(i * SPACING, 0.0, i, KEY) for i in range(size)]
+    rng = random.Random(seed)
+    next_id = size
+    started = time.perf_counter()
+    for _ in range(pairings):
+        rating = rng.randrange(size) * SPACING
+        ticket = Ticket(rating + 1, 0.0, next_id, KEY)
+        best = min(
+            (candidate for candidate in waiting if acceptable(ticket, candidate, 0.0)),
+            key=lambda candidate: abs(candidate.rating - ticket.rating),
+        )
+        waiting.remove(best)
+        waiting.append(Ticket(rating, 0.0, next_id + 1, KEY))
+        next_id += 2
+    elapsed = time.perf_counter() - started
+    print(f'{"linear scan":<16}{pairings / elapsed:>14,.0f} pairs/s{elapsed / pairings * 1e6:>10.1f} us/pair')
+
+
+def bench_sweep(size: int) -> None:
+    service = standing_queue(size)
+    started = time.perf_counter()
+    assert service.sweep(now=0.0) == []
+    idle_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    matched = len(service.sweep(now=60.0))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f'sweep over {size:,}: {idle_ms:.1f} ms with no pairs, {elapsed_ms:.1f} ms pairing {matched:,} after windows widen')
+
+
+def opening(match: Match) -> Opening:
+    room = GameRoom(0, match.player1.player_id, match.player2.player_id)
+    room.start_turn()
+    return room.opening()
+
+
+def bench_insert(matches: List[Match], dsn: str) -> None:
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE games (LIKE games INCLUDING DEFAULTS) ON COMMIT PRESERVE ROWS")
+            cur.execute("CREATE TEMP SEQUENCE bench_games_id")
+            cur.execute("ALTER TABLE pg_temp.games ALTER COLUMN id SET DEFAULT nextval('bench_games_id')")
+        conn.commit()
+
+        openings = [opening(match) for match in matches]
+        for batch_size in (MATCH_BATCH_SIZE, 1):
+            started = time.perf_counter()
+            written = len(insert_games(conn, matches, openings, batch_size))
+            elapsed = time.perf_counter() - started
+            print(f'insert {written:,} matches, {batch_size:>3} per INSERT: {written / elapsed:>10,.0f} rows/s')
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--queued', type=int, default=10_000)
+    parser.add_argument('--pairings', type=int, default=20_000)
+    parser.add_argument('--database', action='store_true')
+    args = parser.parse_args()
+
+    dsn = os.environ.get('DATABASE_URL')
+    if args.database and not dsn:
+        sys.exit('DATABASE_URL is not set')
+
+    print(f'{args.queued:,} players queued in one (time_control, bet_amount) bucket')
+    matches = bench_sorted(args.queued, args.pairings)
+    bench_linear(args.queued, max(1, args.pairings // 20))
+    bench_sweep(args.queued)
+    if args.database:
+        bench_insert(matches, dsn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+'''
+Business: Размер и скорость декодирования бинарного журнала ходов против JSON с текстовыми ходами
+Args: --games N --seed N
+Returns: Байт на партию, ходов/сек при декодировании, время перехода к середине партии
+
+Run from backend/: python benchmarks/bench_movelog.py --games 500
+The text form is what Game.tsx keeps in moveHistory ("♘ b1 → c3") plus the
+rolled dice per turn, serialised as JSON and parsed back into squares.
+'''
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.engine import BLACK, KING, PIECE_TYPES, TYPE_MASK, WHITE, Board, type_mask
+from shared.movelog import MoveLogWriter, iter_moves
+
+SYMBOLS = {
+    WHITE: dict(zip(PIECE_TYPES, '♟♞♝♜♛♚')),
+    BLACK: dict(zip(PIECE_TYPES, '♙♘♗♖♕♔')),
+}
+SYMBOL_TYPES = {symbol: piece_type for table in SYMBOLS.values() for piece_type, symbol in table.items()}
+
+
+def to_index(square: int) -> int:
+    return (square >> 4) * 8 + (square & 7)
+
+
+def name(index: int) -> str:
+    return f'{chr(97 + index % 8)}{8 - index // 8}'
+
+
+def random_game(rng: random.Random, max_turns: int = 120) -> Tuple[bytes, str, int]:
+    board = Board.initial()
+    writer = MoveLogWriter()
+    turns: List[Dict[str, Any]] = []
+    color = WHITE
+    plies = 0
+    for _ in range(max_turns):
+        dice = [rng.choice(PIECE_TYPES) for _ in range(3)]
+        writer.begin_turn(dice)
+        text_moves: List[str] = []
+        remaining = list(dice)
+        finished = False
+        while remaining:
+            moves = board.moves(color, type_mask(remaining))
+            if not moves:
+                break
+            move = rng.choice(moves)
+            frm, to = move & 127, move >> 7
+            piece_type = PIECE_TYPES[(board.squares[frm] & TYPE_MASK) - 1]
+            captured = board.make(move)
+            writer.add_move(to_index(frm), to_index(to), piece_type, bool(captured))
+            text_moves.append(f'{SYMBOLS[color][piece_type]} {name(to_index(frm))} → {name(to_index(to))}')
+            remaining.remove(piece_type)
+            plies += 1
+            if captured & TYPE_MASK == KING:
+                finished = True
+                break
+        turns.append({'dice': dice, 'moves': text_moves})
+        if finished:
+            break
+        color ^= BLACK
+    return writer.getvalue(), json.dumps(turns, ensure_ascii=False), plies
+
+
+def parse_square(text: str) -> int:
+    return (8 - int(text[1])) * 8 + ord(text[0]) - 97
+
+
+def decode_text(text: str) -> int:
+    decoded = 0
+    for turn in json.loads(text):
+        for move in turn['moves']:
+            symbol, frm, _, to = move.split(' ')
+            _ = (SYMBOL_TYPES[symbol], parse_square(frm), parse_square(to))
+            decoded += 1
+    return decoded
+
+
+def decode_binary(data: bytes) -> int:
+    decoded = 0
+    for _ in iter_moves(data):
+        decoded += 1
+    return decoded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=9)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    games = [random_game(rng) for _ in range(args.games)]
+    plies = sum(game[2] for game in games)
+
+    binary_bytes = sum(len(game[0]) for game in games)
+    text_bytes = sum(len(game[1].encode()) for game in games)
+    print(f'games {len(games)}, moves {plies}')
+    print(f'size   text/json {text_bytes / len(games):8.0f} B/game   binary {binary_bytes / len(games):8.0f} B/game'
+          f'   ({text_bytes / binary_bytes:.1f}x smaller)')
+
+    started = time.perf_counter()
+    assert sum(decode_text(game[1]) for game in games) == plies
+    text_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    assert sum(decode_binary(game[0]) for game in games) == plies
+    binary_s = time.perf_counter() - started
+    print(f'decode text/json {plies / text_s:>12,.0f} moves/s   binary {plies / binary_s:>12,.0f} moves/s')
+
+    started = time.perf_counter()
+    for data, _, count in games:
+        next(iter_moves(data, count // 2), None)
+    seek_us = (time.perf_counter() - started) / len(games) * 1_000_000
+    print(f'seek to middle move: {seek_us:.1f} us per game')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+'''
+Business: Perft-бенчмарк серверного генератора ходов и сверка с правилами Game.tsx
+Args: --depth N --positions N --seed N
+Returns: Узлы/сек для 0x88-генератора и для порта getAllValidMoves, число расхождений
+
+Run from backend/: python benchmarks/bench_perft.py --depth 3
+The reference side is a line-by-line port of isValidMove/isPathClear/
+getAllValidMoves from src/pages/Game.tsx (64 x 64 scan over nested rows,
+board copied per move). Any mismatch in move sets exits with status 1.
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List, Optional, Set, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.engine import (
+    ALL_TYPES, BLACK, KING, PIECE_TYPES, TYPE_MASK, WHITE,
+    Board, make_move, perft, type_mask,
+)
+
+Cell = Optional[Tuple[str, str]]
+Rows = List[List[Cell]]
+
+
+def sign(value: int) -> int:
+    return (value > 0) - (value < 0)
+
+
+def ts_is_path_clear(rows: Rows, fr: int, fc: int, tr: int, tc: int) -> bool:
+    dx, dy = sign(tc - fc), sign(tr - fr)
+    x, y = fc + dx, fr + dy
+    while x != tc or y != tr:
+        if rows[y][x]:
+            return False
+        x += dx
+        y += dy
+    return True
+
+
+def ts_is_valid_move(rows: Rows, fr: int, fc: int, tr: int, tc: int, piece: Tuple[str, str]) -> bool:
+    piece_type, color = piece
+    dx, dy = abs(tc - fc), abs(tr - fr)
+    target = rows[tr][tc]
+    if target and target[1] == color:
+        return False
+    if piece_type == 'pawn':
+        direction = -1 if color == 'white' else 1
+        start_row = 6 if color == 'white' else 1
+        if tc == fc and not target:
+            if tr == fr + direction:
+                return True
+            if fr == start_row and tr == fr + 2 * direction and not rows[fr + direction][fc]:
+                return True
+        return dx == 1 and tr == fr + direction and bool(target)
+    if piece_type == 'knight':
+        return (dx == 2 and dy == 1) or (dx == 1 and dy == 2)
+    if piece_type == 'bishop':
+        return dx == dy and ts_is_path_clear(rows, fr, fc, tr, tc)
+    if piece_type == 'rook':
+        return (dx == 0 or dy == 0) and ts_is_path_clear(rows, fr, fc, tr, tc)
+    if piece_type == 'queen':
+        return (dx == dy or dx == 0 or dy == 0) and ts_is_path_clear(rows, fr, fc, tr, tc)
+    if piece_type == 'king':
+        return dx <= 1 and dy <= 1
+    return False
+
+
+def ts_all_valid_moves(rows: Rows, color: str, allowed: List[str]) -> List[Tuple[int, int, int, int]]:
+    moves = []
+    for fr in range(8):
+        for fc in range(8):
+            piece = rows[fr][fc]
+            if piece and piece[1] == color and piece[0] in allowed:
+                for tr in range(8):
+                    for tc in range(8):
+                        if ts_is_valid_move(rows, fr, fc, tr, tc, piece):
+                            moves.append((fr, fc, tr, tc))
+    return moves
+
+
+def ts_perft(rows: Rows, color: str, depth: int) -> int:
+    if depth == 0:
+        return 1
+    moves = ts_all_valid_moves(rows, color, list(PIECE_TYPES))
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for fr, fc, tr, tc in moves:
+        captured = rows[tr][tc]
+        new_rows = [row[:] for row in rows]
+        new_rows[tr][tc] = new_rows[fr][fc]
+        new_rows[fr][fc] = None
+        if captured and captured[0] == 'king':
+            nodes += 1
+        else:
+            nodes += ts_perft(new_rows, 'black' if color == 'white' else 'white', depth - 1)
+    return nodes
+
+
+def move_set(board: Board, color: int, allowed: int) -> Set[int]:
+    return set(board.moves(color, allowed))
+
+
+def reference_move_set(rows: Rows, color: str, allowed: List[str]) -> Set[int]:
+    return {make_move(fr * 16 + fc, tr * 16 + tc) for fr, fc, tr, tc in ts_all_valid_moves(rows, color, allowed)}
+
+
+def verify_random_positions(positions: int, seed: int) -> int:
+    rng = random.Random(seed)
+    mismatches = 0
+    checked = 0
+    while checked < positions:
+        board = Board.initial()
+        color = WHITE
+        for _ in range(rng.randint(0, 80)):
+            dice = [rng.choice(PIECE_TYPES) for _ in range(3)]
+            allowed = type_mask(dice)
+            rows = board.to_rows()
+            name = 'white' if color == WHITE else 'black'
+            if move_set(board, color, allowed) != reference_move_set(rows, name, dice):
+                mismatches += 1
+            checked += 1
+            moves = board.moves(color, ALL_TYPES)
+            if not moves:
+                break
+            if board.make(rng.choice(moves)) & TYPE_MASK == KING:
+                break
+            color ^= BLACK
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--positions', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    board = Board.initial()
+    rows = board.to_rows()
+
+    started = time.perf_counter()
+    nodes = perft(board, WHITE, args.depth)
+    engine_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reference_nodes = ts_perft(rows, 'white', args.depth)
+    reference_s = time.perf_counter() - started
+
+    print(f'perft({args.depth}) engine    {nodes:>10} nodes {nodes / engine_s:>12,.0f} nodes/s')
+    print(f'perft({args.depth}) reference {reference_nodes:>10} nodes {reference_nodes / reference_s:>12,.0f} nodes/s')
+    print(f'speedup {reference_s / engine_s:.1f}x')
+
+    mismatches = verify_random_positions(args.positions, args.seed)
+    print(f'random positions checked: {args.positions}, mismatches: {mismatches}')
+
+    if nodes != reference_nodes or mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
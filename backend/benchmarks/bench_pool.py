@@ -0,0 +1,89 @@
+'''
+Business: Сравнение стоимости нового подключения к Postgres и соединения из пула
+Args: --iterations N, DATABASE_URL в окружении
+Returns: Таблица p50/p95/mean по каждому действию в миллисекундах
+
+Run from backend/: python benchmarks/bench_pool.py --iterations 200
+'''
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stats import percentile
+from shared.db import ConnectionPool
+
+ACTIONS: Dict[str, Tuple[str, Tuple[Any, ...]]] = {
+    'auth.login': (
+        "SELECT id, username, email FROM players WHERE email = %s AND password_hash = %s",
+        ('bench@example.com', ''),
+    ),
+    'player.session': (
+        "SELECT player_id FROM sessions WHERE token = %s AND expires_at > CURRENT_TIMESTAMP",
+        ('bench-token',),
+    ),
+    'payment.webhook': (
+        "SELECT id FROM t_p26016213_dice_chess_website.purchases WHERE payment_id = %s",
+        ('bench-payment',),
+    ),
+}
+
+
+def measure(run: Callable[[], None], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=100)
+    args = parser.parse_args()
+
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        sys.exit('DATABASE_URL is not set')
+
+    pool = ConnectionPool(dsn, maxconn=1)
+
+    print(f"{'action':<18}{'mode':<8}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for name, (sql, params) in ACTIONS.items():
+        def fresh() -> None:
+            conn = psycopg2.connect(dsn)
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql, params)
+                    cur.fetchall()
+            finally:
+                conn.close()
+
+        def pooled() -> None:
+            with pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql, params)
+                    cur.fetchall()
+
+        pooled()
+        for mode, run in (('fresh', fresh), ('pooled', pooled)):
+            samples = measure(run, args.iterations)
+            print(
+                f'{name:<18}{mode:<8}'
+                f'{percentile(samples, 50):>10.2f}'
+                f'{percentile(samples, 95):>10.2f}'
+                f'{statistics.mean(samples):>10.2f}'
+            )
+
+    pool.closeall()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+'''
+Business: Сравнение COUNT(*) по players с поиском места через гистограмму рейтингов и цена её поддержки триггером
+Args: --sizes 10000,100000,1000000 --lookups N --writers 16 --updates 200, DATABASE_URL в окружении для режима --database
+Returns: Среднее время одного вычисления места в микросекундах; с --database ещё tx/s и взаимоблокировки при смене рейтингов
+
+Run from backend/: python benchmarks/bench_rank.py [--database]
+Without --database the COUNT(*) side is modelled in-process as a scan over the
+rating column, which is what the range scan on idx_players_rating does.
+--database runs against the migrated schema (V0011's sharded rating_histogram
+and its statement-level triggers), so point DATABASE_URL at a disposable
+database. Each size seeds that many bench-rank-* players with one INSERT,
+times COUNT(*) against rank.load_index, then has --writers connections
+commit real UPDATE players SET rating statements, all moving players between
+1000 and 1016, the ratings every new player crowds around. Afterwards the
+summed shards must equal COUNT(*) per rating, and the bench players are
+deleted again through the same triggers.
+'''
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stats import percentile
+from shared.rank import RankIndex, load_index
+
+SCHEMA = 't_p26016213_dice_chess_website'
+BENCH_PREFIX = 'bench-rank-'
+
+
+def synthetic_ratings(size: int, seed: int = 42) -> List[int]:
+    rng = random.Random(seed)
+    return [max(100, min(3000, int(rng.gauss(1200, 250)))) for _ in range(size)]
+
+
+def per_call_us(run: Callable[[int], int], probes: List[int]) -> float:
+    started = time.perf_counter()
+    for rating in probes:
+        run(rating)
+    return (time.perf_counter() - started) / len(probes) * 1_000_000
+
+
+def bench_in_process(size: int, lookups: int) -> None:
+    ratings = synthetic_ratings(size)
+    probes = random.Random(7).sample(ratings, min(lookups, size))
+    index = RankIndex(Counter(ratings).items())
+
+    scan = per_call_us(lambda r: sum(1 for x in ratings if x > r) + 1, probes[:max(1, lookups // 100)])
+    bisect = per_call_us(index.rank_of, probes)
+    print(f'{size:>10}{scan:>16.1f}{bisect:>16.2f}{scan / bisect:>10.0f}x')
+
+
+def seed_players(dsn: str, size: int) -> List[int]:
+    '''size bench players in one INSERT, so the histogram trigger runs once for all of them.'''
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            started = time.perf_counter()
+            cur.execute(
+                f"""INSERT INTO players (email, username, password_hash, rating)
+                    SELECT '{BENCH_PREFIX}' || i || '@example.invalid', '{BENCH_PREFIX}' || i, '',
+                           GREATEST(100, LEAST(3000, (1200 + 250 * sqrt(-2 * ln(1 - random())) * cos(2 * pi() * random()))::int))
+                    FROM generate_series(1, %s) AS i
+                    RETURNING id""",
+                (size,)
+            )
+            ids = [row[0] for row in cur.fetchall()]
+        conn.commit()
+        print(f'  seeded {size:,} players in {(time.perf_counter() - started) * 1000:.0f} ms (one statement-level trigger run)')
+        return ids
+    finally:
+        conn.close()
+
+
+def delete_players(dsn: str) -> None:
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM players WHERE email LIKE '{BENCH_PREFIX}%%'")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def bench_lookups(dsn: str, size: int, lookups: int) -> None:
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT rating FROM players WHERE rating IS NOT NULL ORDER BY random() LIMIT %s", (lookups,))
+            probes = [row[0] for row in cur.fetchall()]
+
+            def count_query(rating: int) -> int:
+                cur.execute("SELECT COUNT(*) FROM players WHERE rating > %s", (rating,))
+                return cur.fetchone()[0] + 1
+
+            started = time.perf_counter()
+            index = load_index(conn)
+            load_ms = (time.perf_counter() - started) * 1000
+
+            scan = per_call_us(count_query, probes)
+            bisect = per_call_us(index.rank_of, probes)
+            print(f'{size:>10}{scan:>16.1f}{bisect:>16.2f}{scan / bisect:>10.0f}x   (rating_histogram load {load_ms:.1f} ms)')
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def bench_writers(dsn: str, ids: List[int], writers: int, updates: int) -> None:
+    '''Concurrent games settling around the crowded 1000 rating: every UPDATE moves a player between 1000 and 1016.'''
+    import psycopg2
+    from psycopg2 import errors
+
+    latencies: List[float] = []
+    deadlocks = [0]
+    lock = threading.Lock()
+
+    def work(own: List[int]) -> None:
+        conn = psycopg2.connect(dsn)
+        samples = []
+        try:
+            with conn.cursor() as cur:
+                for step in range(updates):
+                    player_id = own[step % len(own)]
+                    started = time.perf_counter()
+                    while True:
+                        try:
+                            cur.execute(
+                                "UPDATE players SET rating = CASE WHEN rating = 1000 THEN 1016 ELSE 1000 END WHERE id = %s",
+                                (player_id,)
+                            )
+                            conn.commit()
+                            break
+                        except errors.DeadlockDetected:
+                            conn.rollback()
+                            with lock:
+                                deadlocks[0] += 1
+                    samples.append((time.perf_counter() - started) * 1000)
+        finally:
+            conn.close()
+        with lock:
+            latencies.extend(samples)
+
+    per_writer = max(1, len(ids) // writers)
+    threads = [threading.Thread(target=work, args=(ids[i * per_writer:(i + 1) * per_writer] or ids[:1],)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(
+        f'  {writers} writers x {updates} rating UPDATEs: {len(latencies) / elapsed:,.0f} tx/s, '
+        f'p50 {percentile(latencies, 50):.2f} ms, p95 {percentile(latencies, 95):.2f} ms, {deadlocks[0]} deadlocks'
+    )
+
+
+def check_histogram(dsn: str) -> bool:
+    '''Summed shards must equal COUNT(*) per rating; single shards may legitimately go negative.'''
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT COUNT(*) FROM (
+                       SELECT rating, SUM(players) AS players FROM rating_histogram GROUP BY rating
+                   ) h
+                   FULL JOIN (
+                       SELECT rating, COUNT(*) AS players FROM players WHERE rating IS NOT NULL GROUP BY rating
+                   ) p USING (rating)
+                   WHERE COALESCE(h.players, 0) <> COALESCE(p.players, 0)"""
+            )
+            mismatched = cur.fetchone()[0]
+            cur.execute("SELECT COUNT(*), COUNT(*) FILTER (WHERE players < 0), COUNT(DISTINCT shard) FROM rating_histogram")
+            rows, negative, shards = cur.fetchone()
+        conn.rollback()
+    finally:
+        conn.close()
+    print(f'  rating_histogram: {rows:,} rows over {shards} shards, {negative} negative shards, {mismatched} ratings off COUNT(*)')
+    return mismatched == 0
+
+
+def bench_database(size: int, lookups: int, writers: int, updates: int, dsn: str) -> bool:
+    delete_players(dsn)
+    try:
+        ids = seed_players(dsn, size)
+        bench_lookups(dsn, size, lookups)
+        bench_writers(dsn, ids, writers, updates)
+        return check_histogram(dsn)
+    finally:
+        delete_players(dsn)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--lookups', type=int, default=1000)
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--updates', type=int, default=200, help='rating UPDATEs per writer')
+    parser.add_argument('--database', action='store_true')
+    args = parser.parse_args()
+
+    dsn = os.environ.get('DATABASE_URL')
+    if args.database and not dsn:
+        sys.exit('DATABASE_URL is not set')
+    os.environ.setdefault('PGOPTIONS', f'-c search_path={SCHEMA}')
+
+    consistent = True
+    print(f"{'players':>10}{'count(*) us':>16}{'histogram us':>16}{'speedup':>11}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        if args.database:
+            consistent = bench_database(size, args.lookups, args.writers, args.updates, dsn) and consistent
+        else:
+            bench_in_process(size, args.lookups)
+    if not consistent:
+        sys.exit('rating_histogram does not match players')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+'''
+Business: Скорость пересчёта рейтингов по всей истории партий: построчно в Python против NumPy по периодам
+Args: --games 1000000 --players 20000 --slice 3600, --database (через именованный курсор и COPY), DATABASE_URL в окружении для --database
+Returns: Строк в секунду для обоих вариантов, пиковая память, расхождение рейтингов с построчным пересчётом
+
+Run from backend/: python benchmarks/bench_rating_replay.py [--games 1000000] [--database]
+The synthetic history is produced the way production wrote it: games are
+finished one by one through rating.elo_changes, one game per --spacing
+seconds, a share of them against bots, and the stored changes go into the
+rows. That loop is also the row-by-row baseline. The vectorised replay then
+runs twice with the same K: over the first --check games with one game per
+period, where it must match the baseline exactly, and over everything with
+--slice second periods.
+--database copies the history into temporary games and players tables that
+shadow the real ones for the session and runs the full replay: named-cursor
+streaming, replay, COPY and UPDATE ... FROM.
+'''
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.rating import BOT_RATINGS, ELO_K_FACTOR, elo_changes
+from shared.rating_replay import (
+    INITIAL_RATING, REPLAY_CHUNK_ROWS, RESULT_POINTS, RatingReplay, chunk_from_rows, replay, write_ratings,
+)
+
+BOT_SHARE = 0.3
+DIFFICULTIES = tuple(BOT_RATINGS)
+SCORES = {'player1': 1.0, 'player2': 0.0, 'draw': 0.5}
+
+
+def synthetic_history(
+    games: int, players: int, spacing: int, check: int, seed: int = 7
+) -> Tuple[List[Tuple[int, ...]], List[Tuple[str, str, int, int]], np.ndarray, np.ndarray, float]:
+    '''Rows as GAMES_QUERY returns them, the rest of each games row, row-by-row ratings after check and all games, rows/s.'''
+    rng = random.Random(seed)
+    ratings = [INITIAL_RATING] * (players + 1)
+    strength = [rng.gauss(0, 200) for _ in range(players + 1)]
+    rows: List[Tuple[int, ...]] = []
+    extra: List[Tuple[str, str, int, int]] = []
+    plan = []
+    for i in range(games):
+        player1 = rng.randint(1, players)
+        if rng.random() < BOT_SHARE:
+            difficulty = rng.choice(DIFFICULTIES)
+            player2, gap = 0, strength[player1] + 1200 - BOT_RATINGS[difficulty]
+        else:
+            difficulty = ''
+            player2 = rng.randint(1, players - 1)
+            player2 += player2 >= player1
+            gap = strength[player1] - strength[player2]
+        win = 1 / (1 + 10 ** (-gap / 400))
+        roll = rng.random()
+        result = 'draw' if roll < 0.1 else 'player1' if roll < 0.1 + 0.9 * win else 'player2'
+        plan.append((i * spacing, player1, player2, difficulty, result))
+
+    checked = np.array(ratings, dtype=np.int64)
+    started = time.perf_counter()
+    for i, (ended, player1, player2, difficulty, result) in enumerate(plan):
+        if i == check:
+            checked = np.array(ratings, dtype=np.int64)
+        rating2 = ratings[player2] if player2 else BOT_RATINGS[difficulty]
+        change1, change2 = elo_changes(ratings[player1], rating2, SCORES[result])
+        ratings[player1] += change1
+        if player2:
+            ratings[player2] += change2
+        else:
+            change2 = 0
+        rows.append((ended, player1, player2, RESULT_POINTS[result], rating2 if not player2 else INITIAL_RATING))
+        extra.append((difficulty, result, change1, change2))
+    rows_per_second = games / (time.perf_counter() - started)
+    final = np.array(ratings, dtype=np.int64)
+    return rows, extra, checked if check < games else final, final, rows_per_second
+
+
+def measured(run: Callable[[], RatingReplay]) -> Tuple[RatingReplay, float, int]:
+    '''Engine, rows/s and peak traced bytes; tracemalloc slows per-row allocations, so it gets its own pass.'''
+    started = time.perf_counter()
+    engine = run()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return engine, engine.games / elapsed, peak
+
+
+def replay_rows(rows: List[Tuple[int, ...]], players: int, slice_seconds: int, chunk_rows: int) -> RatingReplay:
+    engine = RatingReplay(players, ELO_K_FACTOR, slice_seconds)
+    for start in range(0, len(rows), chunk_rows):
+        engine.feed(chunk_from_rows(rows[start:start + chunk_rows]))
+    engine.finish()
+    return engine
+
+
+def bench_database(
+    dsn: str, rows: List[Tuple[int, ...]], extra: List[Tuple[str, str, int, int]], players: int, slice_seconds: int
+) -> np.ndarray:
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE players (LIKE players INCLUDING DEFAULTS) ON COMMIT PRESERVE ROWS")
+            cur.execute("CREATE TEMP TABLE games (LIKE games INCLUDING DEFAULTS) ON COMMIT PRESERVE ROWS")
+            cur.copy_from(
+                io.StringIO(''.join(f'{player_id}\tp{player_id}\t{INITIAL_RATING}\n' for player_id in range(1, players + 1))),
+                'players', columns=('id', 'username', 'rating')
+            )
+            cur.copy_from(
+                io.StringIO(''.join(
+                    f'{i + 1}\t{player1}\t{player2 or chr(92) + "N"}\t{result}\t0\t5+3\t'
+                    f'{time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ended))}\tfinished\t{difficulty or chr(92) + "N"}\t{change1}\t{change2}\n'
+                    for i, ((ended, player1, player2, _, _), (difficulty, result, change1, change2)) in enumerate(zip(rows, extra))
+                )),
+                'games',
+                columns=('id', 'player1_id', 'player2_id', 'result', 'bet_amount', 'time_control', 'ended_at', 'status',
+                         'difficulty', 'player1_rating_change', 'player2_rating_change')
+            )
+            cur.execute("SET TIME ZONE 'UTC'")
+        conn.commit()
+
+        engine, rate, peak = measured(lambda: replay(conn, ELO_K_FACTOR, slice_seconds, REPLAY_CHUNK_ROWS))
+        print(f'{"database replay":<22}{rate:>12,.0f} rows/s  peak {peak / 2**20:.1f} MiB')
+
+        started = time.perf_counter()
+        updated = write_ratings(conn, engine.results())
+        print(f'COPY + UPDATE ... FROM: {updated:,} players in {(time.perf_counter() - started) * 1000:.0f} ms')
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, rating FROM players")
+            written = np.full(players + 1, INITIAL_RATING, dtype=np.int64)
+            for player_id, rating in cur.fetchall():
+                written[player_id] = rating
+        return written
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=1_000_000)
+    parser.add_argument('--players', type=int, default=20_000)
+    parser.add_argument('--spacing', type=int, default=5, help='seconds between finished games')
+    parser.add_argument('--slice', type=int, default=3600)
+    parser.add_argument('--chunk', type=int, default=REPLAY_CHUNK_ROWS)
+    parser.add_argument('--check', type=int, default=20_000, help='games replayed one per period against the baseline')
+    parser.add_argument('--database', action='store_true')
+    args = parser.parse_args()
+
+    dsn = os.environ.get('DATABASE_URL')
+    if args.database and not dsn:
+        sys.exit('DATABASE_URL is not set')
+
+    rows, extra, checked, expected, baseline_rate = synthetic_history(args.games, args.players, args.spacing, args.check)
+    print(f'{args.games:,} games between {args.players:,} players, {BOT_SHARE:.0%} against bots')
+    print(f'{"row by row":<22}{baseline_rate:>12,.0f} rows/s')
+
+    exact = replay_rows(rows[:args.check], args.players, args.spacing, args.chunk)
+    mismatched = int(np.count_nonzero(exact.ratings != checked))
+    print(f'one game per period over the first {min(args.check, args.games):,} games: {mismatched} ratings differ')
+
+    periods, rate, peak = measured(lambda: replay_rows(rows, args.players, args.slice, args.chunk))
+    deviation = np.abs(periods.ratings - expected)[1:]
+    print(
+        f'{f"{args.slice}s periods":<22}{rate:>12,.0f} rows/s  peak {peak / 2**20:.1f} MiB  '
+        f'{periods.slices:,} periods, mean |diff| {deviation.mean():.1f}, max {deviation.max()}'
+    )
+
+    if args.database:
+        written = bench_database(dsn, rows, extra, args.players, args.slice)
+        print(f'written ratings match the in-memory replay: {bool(np.array_equal(written[1:], periods.ratings[1:]))}')
+
+
+if __name__ == '__main__':
+    main()
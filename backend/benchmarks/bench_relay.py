@@ -0,0 +1,204 @@
+'''
+Business: Сколько одновременных PvP-партий держит один процесс relay на одно ядро
+Args: --games 500 --seconds 20 --think 0.5 --clients 2 (процессов-клиентов), --flush-interval 2
+Returns: Ходов в секунду, задержка хода p50/p95/p99, CPU сервера, партий на ядро и число пакетных записей
+
+Run from backend/: python benchmarks/bench_relay.py [--games 500]
+The relay runs in its own process on a MemoryStore that opens a game for any
+id, seated by its slot s = (id - 1) % --games + 1 as white = 2 * s and
+black = 2 * s + 1 with tokens 'p<player id>', and only counts the batches it
+is asked to save. Client processes open one keep-alive
+long-poll connection per player; a player whose turn it is waits --think
+seconds, then posts a random move from the state's legal moves. A finished
+game is replaced by game id + --games, so --games stay live throughout.
+Games per core is --games scaled by wall time over the relay's CPU time: how
+many games of this pace one fully busy core would carry.
+'''
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.stats import percentile
+from shared.relay import GameRoom, Relay, serve
+
+HOST = '127.0.0.1'
+
+
+class MemoryStore:
+    def __init__(self, games: int) -> None:
+        self.games = games
+        self.batches = 0
+        self.rows = 0
+
+    def load(self, game_id: int) -> Tuple[int, int, str, bytes]:
+        slot = (game_id - 1) % self.games + 1
+        room = GameRoom(game_id, slot * 2, slot * 2 + 1)
+        room.start_turn()
+        return (slot * 2, slot * 2 + 1) + room.opening()
+
+    def save(self, rows: List[Any]) -> None:
+        self.batches += 1
+        self.rows += len(rows)
+
+    def authenticate(self, token: str) -> Optional[int]:
+        return int(token[1:]) if token.startswith('p') and token[1:].isdigit() else None
+
+
+def run_server(port: int, games: int, flush_interval: float, ready: Any, commands: Any, replies: Any) -> None:
+    store = MemoryStore(games)
+    relay = Relay(store, flush_interval=flush_interval)
+
+    async def main() -> None:
+        server = asyncio.ensure_future(serve(HOST, port, relay))
+        await asyncio.sleep(0.2)
+        ready.set()
+        loop = asyncio.get_running_loop()
+        while await loop.run_in_executor(None, commands.get) == 'mark':
+            replies.put((time.perf_counter(), time.process_time(), store.batches, store.rows))
+        server.cancel()
+
+    asyncio.run(main())
+
+
+class Player:
+    def __init__(self, port: int, player_id: int, think: float, rng: random.Random):
+        self.port = port
+        self.player_id = player_id
+        self.think = think
+        self.rng = rng
+        self.latencies: List[float] = []
+        self.moves = 0
+        self.games = 0
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b'') -> Dict[str, Any]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(HOST, self.port)
+        self.writer.write(
+            f'{method} {path} HTTP/1.1\r\nHost: relay\r\nX-Auth-Token: p{self.player_id}\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+        )
+        await self.writer.drain()
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':', 1)[1])
+        return json.loads(await self.reader.readexactly(length))
+
+    async def play(self, game_id: int, games: int, deadline: float) -> None:
+        color = 'white' if self.player_id % 2 == 0 else 'black'
+        state: Dict[str, Any] = {'version': -1, 'status': 'active', 'turn': None}
+        while time.perf_counter() < deadline:
+            if state['status'] == 'finished':
+                self.games += 1
+                game_id += games
+                state = {'version': -1, 'status': 'active', 'turn': None}
+            if state['turn'] != color or not state.get('moves'):
+                state = await self.request('GET', f'/games/{game_id}?after={state["version"]}')
+                if 'error' in state:
+                    raise RuntimeError(state['error'])
+                continue
+
+            await asyncio.sleep(self.think * self.rng.uniform(0.5, 1.5))
+            frm, to = self.rng.choice(state['moves'])
+            started = time.perf_counter()
+            state = await self.request('POST', f'/games/{game_id}/moves', json.dumps({'from': frm, 'to': to}).encode())
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            if 'error' in state:
+                raise RuntimeError(state['error'])
+            self.moves += 1
+        if self.writer is not None:
+            self.writer.close()
+
+
+def run_clients(port: int, game_ids: List[int], games: int, think: float, seconds: float, results: Any) -> None:
+    async def main() -> List[Player]:
+        rng = random.Random(game_ids[0])
+        deadline = time.perf_counter() + seconds
+        players = [
+            Player(port, player_id, think, rng)
+            for game_id in game_ids
+            for player_id in (game_id * 2, game_id * 2 + 1)
+        ]
+        await asyncio.gather(*(player.play(player.player_id // 2, games, deadline) for player in players))
+        return players
+
+    players = asyncio.run(main())
+    results.put((
+        [latency for player in players for latency in player.latencies],
+        sum(player.moves for player in players),
+        sum(player.games for player in players) // 2,
+    ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--think', type=float, default=0.5)
+    parser.add_argument('--clients', type=int, default=2)
+    parser.add_argument('--flush-interval', type=float, default=2)
+    parser.add_argument('--port', type=int, default=8091)
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    commands, replies, results = multiprocessing.Queue(), multiprocessing.Queue(), multiprocessing.Queue()
+    server = multiprocessing.Process(target=run_server, args=(args.port, args.games, args.flush_interval, ready, commands, replies))
+    server.start()
+    if not ready.wait(10):
+        sys.exit('relay did not start')
+
+    clients = [
+        multiprocessing.Process(
+            target=run_clients,
+            args=(args.port, list(range(1 + i, args.games + 1, args.clients)), args.games, args.think, args.seconds, results),
+        )
+        for i in range(args.clients)
+    ]
+    for client in clients:
+        client.start()
+
+    # Measure the steady state: skip the first second while connections open.
+    time.sleep(1)
+    commands.put('mark')
+    wall0, cpu0, batches0, rows0 = replies.get()
+    time.sleep(max(0.0, args.seconds - 2))
+    commands.put('mark')
+    wall1, cpu1, batches1, rows1 = replies.get()
+
+    latencies: List[float] = []
+    moves = finished = 0
+    for _ in clients:
+        client_latencies, client_moves, client_games = results.get(timeout=args.seconds + 60)
+        latencies.extend(client_latencies)
+        moves += client_moves
+        finished += client_games
+    for client in clients:
+        client.join()
+    commands.put('stop')
+    server.join(5)
+
+    latencies.sort()
+    wall, cpu = wall1 - wall0, max(cpu1 - cpu0, 1e-9)
+    print(f'{args.games} concurrent games, think {args.think}s, {args.clients} client processes, {args.seconds:.0f}s')
+    print(f'moves: {moves:,} ({moves / args.seconds:,.0f}/s), games finished: {finished:,}')
+    print(f'move latency ms: p50 {percentile(latencies, 50):.2f}  p95 {percentile(latencies, 95):.2f}  p99 {percentile(latencies, 99):.2f}')
+    print(f'relay CPU: {cpu:.2f}s over {wall:.2f}s wall ({cpu / wall:.0%} of one core)')
+    print(f'games per core at this pace: {args.games * wall / cpu:,.0f}')
+    print(f'persistence: {batches1 - batches0} batched UPDATEs, {rows1 - rows0:,} game rows')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+'''
+Business: Замер холодного старта каждой облачной функции и проверка бюджета
+Args: --runs N --update (перезаписать бюджет по текущим замерам с запасом), DATABASE_URL для первого реального запроса
+Returns: Медианы import/первого OPTIONS/первого запроса в мс; код выхода 1 при превышении бюджета
+
+Run from backend/: python benchmarks/coldstart.py --runs 5
+Functions are measured as they deploy: each is built with bundle.py into a
+temporary directory, and each run starts a fresh interpreter with only that
+bundle on its path, imports index.py, then invokes the handler with an
+OPTIONS preflight and with the first case from tests.json. Budgets live in
+benchmarks/coldstart_budget.json.
+'''
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(BACKEND, 'benchmarks', 'coldstart_budget.json')
+METRICS = ('import_ms', 'options_ms', 'first_request_ms')
+HEADROOM = 2.0
+
+PROBE = r'''
+import importlib.util, json, os, sys, time
+path, with_db = sys.argv[1], sys.argv[2] == '1'
+sys.path.insert(0, path)
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location('index', os.path.join(path, 'index.py'))
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+result = {'import_ms': (time.perf_counter() - started) * 1000}
+
+started = time.perf_counter()
+module.handler({'httpMethod': 'OPTIONS', 'headers': {}}, None)
+result['options_ms'] = (time.perf_counter() - started) * 1000
+
+if with_db:
+    case = json.load(open(os.path.join(path, 'tests.json')))['tests'][0]
+    event = {
+        'httpMethod': case.get('method', 'GET'),
+        'headers': case.get('headers', {}),
+        'queryStringParameters': case.get('queryStringParameters'),
+        'body': json.dumps(case.get('body', {})),
+    }
+    started = time.perf_counter()
+    module.handler(event, None)
+    result['first_request_ms'] = (time.perf_counter() - started) * 1000
+print(json.dumps(result))
+'''
+
+
+sys.path.append(BACKEND)
+from bundle import build_all, functions
+
+
+def measure(path: str, runs: int, with_db: bool) -> Dict[str, float]:
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-I', '-c', PROBE, path, '1' if with_db else '0'],
+            cwd=path, check=True, capture_output=True, text=True,
+        ).stdout
+        for metric, value in json.loads(output.strip().splitlines()[-1]).items():
+            samples.setdefault(metric, []).append(value)
+    return {metric: statistics.median(values) for metric, values in samples.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--update', action='store_true')
+    args = parser.parse_args()
+
+    with_db = bool(os.environ.get('DATABASE_URL'))
+    budget = json.load(open(BUDGET_FILE)) if os.path.exists(BUDGET_FILE) else {}
+    over_budget = []
+
+    out = tempfile.mkdtemp(prefix='coldstart-')
+    try:
+        bundles = build_all(out, functions())
+        results = {name: measure(path, args.runs, with_db) for name, path in bundles.items()}
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+    print(f"{'function':<14}" + ''.join(f'{metric:>20}' for metric in METRICS))
+    for name, result in results.items():
+        limits = budget.get(name, {})
+        cells = []
+        for metric in METRICS:
+            if metric not in result:
+                cells.append(f'{"-":>20}')
+                continue
+            limit = limits.get(metric)
+            flag = ''
+            if limit is not None and result[metric] > limit:
+                flag = ' !'
+                over_budget.append(f'{name}.{metric} {result[metric]:.1f} > {limit}')
+            cells.append(f'{result[metric]:>11.1f} / {limit if limit is not None else "-":>5}{flag:<2}')
+        print(f'{name:<14}' + ''.join(cells))
+
+        if args.update:
+            budget[name] = {**limits, **{
+                metric: max(limits.get(metric, 0), round(result[metric] * HEADROOM), 5)
+                for metric in METRICS if metric in result
+            }}
+
+    if args.update:
+        with open(BUDGET_FILE, 'w') as f:
+            json.dump(budget, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if over_budget:
+        print('over budget: ' + '; '.join(over_budget))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+'''
+Business: Нагрузочный прогон сценариев tests.json по всем функциям в одном процессе
+Args: --concurrency N --requests N --fresh (пересоздать схему из db_migrations) --update, DATABASE_URL в окружении
+Returns: p50/p95/p99 в мс, запросов в секунду и число обращений к БД на запрос по каждому сценарию; код выхода 1 при регрессии
+
+Run from backend/: python benchmarks/loadtest.py --concurrency 8 --requests 2000
+Every case from every <function>/tests.json is replayed against the real
+handler, round-robin across worker threads that share the process-wide pool.
+Round trips are counted per request by a psycopg2 connection subclass
+(every execute plus each commit or rollback of an open transaction).
+
+--fresh drops the function schema and applies db_migrations in order, so point
+DATABASE_URL at a disposable database. Fixtures the cases rely on (the
+test@example.com player) are created if missing, and create_payment goes to a
+local YooKassa stub. Results are compared with benchmarks/loadtest_baseline.json:
+round trips must match exactly, p95 may not exceed the baseline by more than
+LATENCY_HEADROOM, and total requests/sec may not fall below its inverse.
+'''
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS = os.path.join(os.path.dirname(BACKEND), 'db_migrations')
+BASELINE_FILE = os.path.join(BACKEND, 'benchmarks', 'loadtest_baseline.json')
+SCHEMA = 't_p26016213_dice_chess_website'
+LATENCY_HEADROOM = 2.0
+
+FIXTURE_EMAIL = 'test@example.com'
+FIXTURE_USERNAME = 'TestPlayer'
+FIXTURE_PASSWORD = 'password123'
+
+sys.path.append(BACKEND)
+from benchmarks.stats import percentile
+from benchmarks.yookassa_stub import YooKassaStub
+
+_round_trips = threading.local()
+
+
+def round_trips() -> int:
+    return getattr(_round_trips, 'count', 0)
+
+
+def _count() -> None:
+    _round_trips.count = round_trips() + 1
+
+
+class CountingCursor(extensions.cursor):
+    def execute(self, query: Any, vars: Any = None) -> Any:
+        _count()
+        return super().execute(query, vars)
+
+    def executemany(self, query: Any, vars_list: Any) -> Any:
+        _count()
+        return super().executemany(query, vars_list)
+
+
+class CountingConnection(extensions.connection):
+    def cursor(self, *args: Any, **kwargs: Any) -> Any:
+        kwargs.setdefault('cursor_factory', CountingCursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self) -> None:
+        if self.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            _count()
+        super().commit()
+
+    def rollback(self) -> None:
+        if self.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            _count()
+        super().rollback()
+
+
+class Case(NamedTuple):
+    name: str
+    handler: Any
+    event: Dict[str, Any]
+    expected_status: int
+
+
+class Sample(NamedTuple):
+    case: int
+    ms: float
+    round_trips: int
+    ok: bool
+
+
+def apply_migrations(dsn: str) -> None:
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+            cur.execute(f'CREATE SCHEMA {SCHEMA}')
+            cur.execute(f'SET search_path TO {SCHEMA}')
+            for name in sorted(os.listdir(MIGRATIONS)):
+                if name.endswith('.sql'):
+                    cur.execute(open(os.path.join(MIGRATIONS, name), encoding='utf-8').read())
+                    print(f'applied {name}')
+    finally:
+        conn.close()
+
+
+def ensure_fixtures(dsn: str) -> None:
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """INSERT INTO players (email, username, password_hash)
+                   VALUES (%s, %s, %s)
+                   ON CONFLICT DO NOTHING""",
+                (FIXTURE_EMAIL, FIXTURE_USERNAME, hashlib.sha256(FIXTURE_PASSWORD.encode()).hexdigest())
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load_handler(name: str) -> Any:
+    spec = importlib.util.spec_from_file_location(f'{name}_index', os.path.join(BACKEND, name, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+def load_cases() -> List[Case]:
+    cases = []
+    for name in sorted(os.listdir(BACKEND)):
+        tests_file = os.path.join(BACKEND, name, 'tests.json')
+        if not os.path.isfile(tests_file):
+            continue
+        handler = load_handler(name)
+        for test in json.load(open(tests_file, encoding='utf-8'))['tests']:
+            event = {
+                'httpMethod': test.get('method', 'GET'),
+                'headers': test.get('headers', {}),
+                'queryStringParameters': test.get('queryStringParameters'),
+                'body': json.dumps(test['body']) if 'body' in test else None,
+            }
+            cases.append(Case(f"{name}: {test['name']}", handler, event, test.get('expectedStatus', 200)))
+    return cases
+
+
+def invoke(case: Case) -> Tuple[float, int, bool]:
+    before = round_trips()
+    started = time.perf_counter()
+    response = case.handler(case.event, None)
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, round_trips() - before, response['statusCode'] == case.expected_status
+
+
+def run(cases: List[Case], concurrency: int, requests: int) -> Tuple[List[Sample], float]:
+    per_worker = max(1, requests // concurrency)
+
+    def worker(offset: int) -> List[Sample]:
+        samples = []
+        for i in range(per_worker):
+            index = (offset + i) % len(cases)
+            samples.append(Sample(index, *invoke(cases[index])))
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return [sample for samples in results for sample in samples], elapsed
+
+
+def summarise(cases: List[Case], samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    report: Dict[str, Any] = {'requests_per_sec': round(len(samples) / elapsed, 1), 'cases': {}}
+    for index, case in enumerate(cases):
+        own = [sample for sample in samples if sample.case == index]
+        if not own:
+            continue
+        latencies = [sample.ms for sample in own]
+        report['cases'][case.name] = {
+            'requests': len(own),
+            'failed': sum(1 for sample in own if not sample.ok),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'round_trips': round(sum(sample.round_trips for sample in own) / len(own), 2),
+        }
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    regressions = []
+    if report['requests_per_sec'] < baseline.get('requests_per_sec', 0) / LATENCY_HEADROOM:
+        regressions.append(f"requests/sec {report['requests_per_sec']} < {baseline['requests_per_sec']} / {LATENCY_HEADROOM}")
+    for name, stats in report['cases'].items():
+        expected = baseline.get('cases', {}).get(name)
+        if expected is None:
+            continue
+        if stats['round_trips'] > expected['round_trips']:
+            regressions.append(f"{name}: round trips {stats['round_trips']} > {expected['round_trips']}")
+        if stats['p95_ms'] > max(expected['p95_ms'] * LATENCY_HEADROOM, 1.0):
+            regressions.append(f"{name}: p95 {stats['p95_ms']} ms > {expected['p95_ms']} ms x {LATENCY_HEADROOM}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--fresh', action='store_true')
+    parser.add_argument('--update', action='store_true')
+    args = parser.parse_args()
+
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        sys.exit('DATABASE_URL is not set')
+
+    os.environ.setdefault('PGOPTIONS', f'-c search_path={SCHEMA}')
+    os.environ['DB_POOL_MAX'] = str(args.concurrency)
+    os.environ.setdefault('YOOKASSA_SHOP_ID', 'loadtest')
+    os.environ.setdefault('YOOKASSA_SECRET_KEY', 'loadtest')
+
+    if args.fresh:
+        apply_migrations(dsn)
+    ensure_fixtures(dsn)
+
+    with YooKassaStub() as stub:
+        os.environ['YOOKASSA_API_URL'] = stub.url
+
+        cases = load_cases()
+        from shared.db import pool
+        if pool.maxconn != args.concurrency:
+            sys.exit(f'shared.db was imported before DB_POOL_MAX was set: pool holds {pool.maxconn}, not {args.concurrency}')
+        pool.connection_factory = CountingConnection
+        pool.closeall()
+
+        for case in cases:
+            invoke(case)
+        samples, elapsed = run(cases, args.concurrency, args.requests)
+
+    report = summarise(cases, samples, elapsed)
+    report['concurrency'] = args.concurrency
+
+    width = max(len(name) for name in report['cases'])
+    print(f"{'case':<{width}}{'reqs':>7}{'fail':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'db rt':>7}")
+    for name, stats in report['cases'].items():
+        print(
+            f"{name:<{width}}{stats['requests']:>7}{stats['failed']:>6}{stats['p50_ms']:>9.2f}"
+            f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['round_trips']:>7.2f}"
+        )
+    print(f"{len(samples)} requests at concurrency {args.concurrency}: {report['requests_per_sec']} req/s")
+
+    failed = [name for name, stats in report['cases'].items() if stats['failed']]
+    baseline = json.load(open(BASELINE_FILE)) if os.path.exists(BASELINE_FILE) else {}
+    regressions = [f'{name}: unexpected status' for name in failed]
+    if baseline and not args.update:
+        regressions += compare(report, baseline)
+
+    if args.update:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write('\n')
+
+    if regressions:
+        print('regressions: ' + '; '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
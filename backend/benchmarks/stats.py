@@ -0,0 +1,15 @@
+'''
+Summary statistics shared by the benchmarks.
+
+Kept free of shared.* imports: importing shared.db builds the process-wide
+pool from DB_POOL_MAX, so a benchmark that sizes the pool must be able to
+import this before it sets the environment.
+'''
+
+from typing import List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,96 @@
+'''
+Local stand-in for the YooKassa /payments endpoint, for offline tests.
+
+    with YooKassaStub(mode='flaky') as stub:
+        os.environ['YOOKASSA_API_URL'] = stub.url
+
+Modes: ok (201 with a confirmation URL), slow (sleeps delay seconds first),
+error (always 500), flaky (503 on the first attempt of each Idempotence-Key,
+201 on the retry), garbage (201 with a body that is not JSON). Every request's key is recorded in stub.keys.
+'''
+
+import json
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List
+
+
+class YooKassaStub:
+    def __init__(self, mode: str = 'ok', delay: float = 0.0):
+        self.mode = mode
+        self.delay = delay
+        self.keys: List[str] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v3'
+
+    def _handler_class(self) -> Any:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self) -> None:
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _reply(self, status: int, body: Any) -> None:
+                data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def do_POST(self) -> None:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                key = self.headers.get('Idempotence-Key', '')
+                with stub._lock:
+                    first_attempt = key not in stub.keys
+                    stub.keys.append(key)
+
+                if stub.mode == 'slow' or stub.delay:
+                    time.sleep(stub.delay)
+                if stub.mode == 'error' or (stub.mode == 'flaky' and first_attempt):
+                    self._reply(503 if stub.mode == 'flaky' else 500, {'type': 'error', 'code': 'internal_server_error'})
+                    return
+                if stub.mode == 'garbage':
+                    self._reply(201, b'<html>Bad Gateway</html>')
+                    return
+
+                payment_id = str(uuid.uuid4())
+                self._reply(201, {
+                    'id': payment_id,
+                    'status': 'pending',
+                    'amount': payload.get('amount'),
+                    'metadata': payload.get('metadata'),
+                    'confirmation': {
+                        'type': 'redirect',
+                        'confirmation_url': f'https://yoomoney.example/checkout/{payment_id}'
+                    }
+                })
+
+        return Handler
+
+    def __enter__(self) -> 'YooKassaStub':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
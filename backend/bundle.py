@@ -0,0 +1,210 @@
+'''
+Business: Сборка каждой облачной функции в самостоятельный каталог с нужными ей модулями shared
+Args: --out build (каталог сборки в корне репозитория) [functions...], --check (проверить без записи)
+Returns: Модули shared и сторонние пакеты по функциям; код выхода 1, если пакет не объявлен в requirements.txt функции или сборка не импортируется сама по себе
+
+Run from backend/: python bundle.py, then deploy build/<function>/ for each function.
+poehali.dev deploys every function directory on its own, so backend/shared is
+not there at runtime. A bundle is the function directory plus the shared
+modules its index.py reaches (imports, and lazy_module('shared.x') names),
+copied into <out>/<function>/shared/ next to index.py, where the handler's own
+directory on the import path finds them; index.py never edits sys.path. The
+same walk collects the third-party packages those modules import, and each
+must be in the function's requirements.txt unless the import sits under
+except ImportError. Every bundle is then imported, together with all of its
+shared modules, in a fresh interpreter whose path holds only the bundle, so a
+missing module fails here rather than on deploy.
+'''
+
+import argparse
+import ast
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(os.path.dirname(BACKEND), 'build')
+SHARED = 'shared'
+
+# Import name -> distribution in requirements.txt, where they differ.
+DISTRIBUTIONS = {'psycopg2': 'psycopg2-binary', 'urllib3': 'requests'}
+IMPORT_ERRORS = ('ImportError', 'ModuleNotFoundError')
+
+IMPORT_CHECK = r'''
+import importlib, sys
+sys.path.insert(0, sys.argv[1])
+for name in ['index'] + sys.argv[2:]:
+    importlib.import_module(name)
+'''
+
+
+class Bundle(NamedTuple):
+    function: str
+    modules: List[str]
+    packages: Set[str]
+    missing: List[str]
+
+
+class ImportScan(ast.NodeVisitor):
+    '''Shared modules and top-level third-party imports of one file; optional ones are those guarded by except ImportError.'''
+
+    def __init__(self) -> None:
+        self.modules: Set[str] = set()
+        self.required: Set[str] = set()
+        self.optional: Set[str] = set()
+        self._guarded = 0
+
+    def _add(self, name: str) -> None:
+        if name == SHARED or name.startswith(SHARED + '.'):
+            self.modules.add(name)
+            return
+        top = name.split('.')[0]
+        if top in sys.stdlib_module_names:
+            return
+        (self.optional if self._guarded else self.required).add(top)
+
+    def visit_Try(self, node: ast.Try) -> None:
+        guarded = any(
+            isinstance(handler.type, ast.Name) and handler.type.id in IMPORT_ERRORS
+            or isinstance(handler.type, ast.Tuple) and any(
+                isinstance(element, ast.Name) and element.id in IMPORT_ERRORS for element in handler.type.elts
+            )
+            for handler in node.handlers
+        )
+        self._guarded += guarded
+        for statement in node.body:
+            self.visit(statement)
+        self._guarded -= guarded
+        for child in node.handlers + node.orelse + node.finalbody:
+            self.visit(child)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self._add(alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.level or not node.module:
+            return
+        if node.module == SHARED:
+            for alias in node.names:
+                self._add(f'{SHARED}.{alias.name}')
+        else:
+            self._add(node.module)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if (
+            isinstance(node.func, ast.Name) and node.func.id == 'lazy_module'
+            and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)
+        ):
+            self._add(node.args[0].value)
+        self.generic_visit(node)
+
+
+def scan(path: str) -> ImportScan:
+    visitor = ImportScan()
+    with open(path, encoding='utf-8') as f:
+        visitor.visit(ast.parse(f.read(), path))
+    return visitor
+
+
+def module_path(module: str) -> str:
+    return os.path.join(BACKEND, *module.split('.')) + '.py'
+
+
+def declared(function: str) -> Set[str]:
+    path = os.path.join(BACKEND, function, 'requirements.txt')
+    if not os.path.exists(path):
+        return set()
+    names = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if line:
+                names.add(line.split('==')[0].split('>=')[0].split('[')[0].strip().lower())
+    return names
+
+
+def functions() -> List[str]:
+    return sorted(
+        name for name in os.listdir(BACKEND)
+        if os.path.isfile(os.path.join(BACKEND, name, 'index.py'))
+    )
+
+
+def resolve(function: str) -> Bundle:
+    modules: Set[str] = set()
+    packages: Set[str] = set()
+    pending = [os.path.join(BACKEND, function, 'index.py')]
+    while pending:
+        found = scan(pending.pop())
+        packages |= found.required
+        for module in sorted(found.modules - modules - {SHARED}):
+            modules.add(module)
+            pending.append(module_path(module))
+    distributions = {DISTRIBUTIONS.get(package, package).lower() for package in packages}
+    return Bundle(function, sorted(modules), packages, sorted(distributions - declared(function)))
+
+
+def build(bundle: Bundle, out: str) -> str:
+    target = os.path.join(out, bundle.function)
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(os.path.join(BACKEND, bundle.function), target, ignore=shutil.ignore_patterns('__pycache__', '*.pyc'))
+    os.makedirs(os.path.join(target, SHARED))
+    shutil.copy2(os.path.join(BACKEND, SHARED, '__init__.py'), os.path.join(target, SHARED, '__init__.py'))
+    for module in bundle.modules:
+        shutil.copy2(module_path(module), os.path.join(target, *module.split('.')) + '.py')
+    return target
+
+
+def import_error(bundle: Bundle, target: str) -> str:
+    '''Imports the built bundle in isolation; returns the error output, empty when it loads.'''
+    result = subprocess.run(
+        [sys.executable, '-I', '-B', '-c', IMPORT_CHECK, target] + bundle.modules,
+        cwd=target, capture_output=True, text=True,
+    )
+    return '' if result.returncode == 0 else result.stderr.strip().splitlines()[-1]
+
+
+def build_all(out: str, names: Iterable[str]) -> Dict[str, str]:
+    '''Builds every named function into out; maps each function to its bundle directory.'''
+    os.makedirs(out, exist_ok=True)
+    return {name: build(resolve(name), out) for name in names}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('functions', nargs='*')
+    parser.add_argument('--out', default=DEFAULT_OUT)
+    parser.add_argument('--check', action='store_true')
+    args = parser.parse_args()
+
+    names = args.functions or functions()
+    out = tempfile.mkdtemp(prefix='bundle-') if args.check else args.out
+    failures = []
+    try:
+        os.makedirs(out, exist_ok=True)
+        for name in names:
+            bundle = resolve(name)
+            target = build(bundle, out)
+            error = import_error(bundle, target)
+            print(f"{name:<12} {len(bundle.modules)} shared modules, packages: {', '.join(sorted(bundle.packages)) or '-'}")
+            if bundle.missing:
+                failures.append(f"{name}: requirements.txt lacks {', '.join(bundle.missing)}")
+            if error:
+                failures.append(f'{name}: bundle does not import on its own: {error}')
+    finally:
+        if args.check:
+            shutil.rmtree(out, ignore_errors=True)
+
+    if failures:
+        print('\n'.join(failures))
+        sys.exit(1)
+    if not args.check:
+        print(f'bundles written to {out}')
+
+
+if __name__ == '__main__':
+    main()
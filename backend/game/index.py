@@ -0,0 +1,174 @@
+import json
+from typing import Dict, Any, List, Optional, Tuple
+
+from shared.achievements import achievement_catalogue, counter_columns, is_blitz
+from shared.http import Request, RowMapper, Router, error_response, json_response
+from shared.rating import elo_changes
+
+RESULT_SCORES = {'player1': 1.0, 'player2': 0.0, 'draw': 0.5}
+
+PLAYER_RESULT_COLUMNS = 'player_id, rating_change, win, loss, draw, blitz_win, tokens_delta, won, lost'
+
+GAME = RowMapper([
+    ('id', 'g.id'),
+    ('status', 'g.status'),
+    ('result', 'g.result'),
+    ('player1_id', 'g.player1_id'),
+    ('player2_id', 'g.player2_id'),
+    ('bet_amount', 'g.bet_amount'),
+    ('time_control', 'g.time_control'),
+    ('winner_id', 'g.winner_id'),
+    ('player1_rating_change', 'g.player1_rating_change'),
+    ('player2_rating_change', 'g.player2_rating_change'),
+    ('game_data', 'g.game_data'),
+    ('player1_rating', 'p1.rating'),
+    ('player2_rating', 'p2.rating'),
+])
+
+STORED_RESULT = RowMapper([
+    ('result', 'result'),
+    ('winner_id', 'winner_id'),
+    ('player1_rating_change', 'player1_rating_change'),
+    ('player2_rating_change', 'player2_rating_change'),
+])
+
+router = Router()
+
+
+def relay_state(game_data: Optional[str]) -> Optional[Dict[str, Any]]:
+    '''State the relay (shared.relay) saved into game_data; None for games it does not run.'''
+    try:
+        snapshot = json.loads(game_data) if game_data else None
+    except ValueError:
+        return None
+    return snapshot.get('relay') if isinstance(snapshot, dict) else None
+
+
+def player_rows(game: Dict[str, Any], result: str, changes: Tuple[int, int]) -> List[Tuple[int, ...]]:
+    rows = []
+    bet = game['bet_amount'] or 0
+    blitz = is_blitz(game['time_control'])
+    for slot, player_id, change in (('player1', game['player1_id'], changes[0]), ('player2', game['player2_id'], changes[1])):
+        win = int(result == slot)
+        loss = int(result not in (slot, 'draw'))
+        draw = int(result == 'draw')
+        rows.append((player_id, change, win, loss, draw, win * blitz, bet * win - bet * loss, bet * win, bet * loss))
+    return rows
+
+
+@router.route('POST', 'finish', auth=True)
+def finish(request: Request) -> Dict[str, Any]:
+    game_id = request.body.get('game_id')
+    if not isinstance(game_id, int) or isinstance(game_id, bool) or game_id < 1:
+        return error_response(400, 'Нужен корректный game_id')
+
+    unlocked: List[int] = []
+    conn = request.conn
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""SELECT {GAME.columns}
+               FROM games g
+               LEFT JOIN players p1 ON p1.id = g.player1_id
+               LEFT JOIN players p2 ON p2.id = g.player2_id
+               WHERE g.id = %s""",
+            (game_id,)
+        )
+        game = GAME.one(cur.fetchone())
+
+        if not game:
+            return error_response(404, 'Игра не найдена')
+
+        if request.player_id not in (game['player1_id'], game['player2_id']):
+            return error_response(403, 'Вы не участвуете в этой игре')
+
+        if game['status'] != 'finished':
+            if game['status'] != 'active':
+                return error_response(409, 'Партия ещё не началась')
+
+            # The relay is authoritative: the result comes from its state, never from the client.
+            relay = relay_state(game['game_data'])
+            if relay is None:
+                return error_response(409, 'Партия ведётся не через сервер ходов')
+            if relay.get('status') != 'finished':
+                return error_response(409, 'Партия ещё идёт')
+            result = {game['player1_id']: 'player1', game['player2_id']: 'player2'}.get(relay.get('winnerId'), 'draw')
+
+            changes = elo_changes(game['player1_rating'] or 1000, game['player2_rating'] or 1000, RESULT_SCORES[result])
+            winner_id = {'player1': game['player1_id'], 'player2': game['player2_id']}.get(result)
+            rows = player_rows(game, result, changes)
+            catalogue = achievement_catalogue.get(conn)
+
+            cur.execute(
+                f"""WITH finished AS (
+                       UPDATE games
+                       SET status = 'finished', result = %s, winner_id = %s, ended_at = CURRENT_TIMESTAMP,
+                           player1_rating_change = %s, player2_rating_change = %s
+                       WHERE id = %s AND status = 'active'
+                       RETURNING id
+                   ), settled AS (
+                       UPDATE players p
+                       SET rating = p.rating + v.rating_change,
+                           total_games = p.total_games + 1,
+                           wins = p.wins + v.win,
+                           losses = p.losses + v.loss,
+                           draws = p.draws + v.draw,
+                           current_streak = CASE WHEN v.win = 1 THEN p.current_streak + 1 ELSE 0 END,
+                           best_win_streak = GREATEST(p.best_win_streak, CASE WHEN v.win = 1 THEN p.current_streak + 1 ELSE 0 END),
+                           blitz_wins = p.blitz_wins + v.blitz_win,
+                           tokens = p.tokens + v.tokens_delta,
+                           tokens_won = p.tokens_won + v.won,
+                           tokens_lost = p.tokens_lost + v.lost,
+                           last_active = CURRENT_TIMESTAMP
+                       FROM (VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(rows))})
+                            AS v({PLAYER_RESULT_COLUMNS}), finished
+                       WHERE p.id = v.player_id
+                       RETURNING {counter_columns('p')}
+                   ), progressed AS (
+                       {catalogue.upsert('settled')}
+                   )
+                   SELECT settled.id, ARRAY(
+                       SELECT progressed.achievement_id FROM progressed
+                       WHERE progressed.player_id = settled.id AND progressed.unlocked
+                       ORDER BY progressed.achievement_id
+                   )
+                   FROM settled""",
+                (result, winner_id, changes[0], changes[1], game_id)
+                + tuple(value for row in rows for value in row)
+            )
+
+            settled = cur.fetchall()
+            if settled:
+                conn.commit()
+                unlocked = dict(settled).get(request.player_id, [])
+                game.update(
+                    status='finished',
+                    result=result,
+                    winner_id=winner_id,
+                    player1_rating_change=changes[0],
+                    player2_rating_change=changes[1]
+                )
+            else:
+                conn.rollback()
+                cur.execute(
+                    f"SELECT {STORED_RESULT.columns} FROM games WHERE id = %s",
+                    (game_id,)
+                )
+                game.update(STORED_RESULT.one(cur.fetchone()))
+
+    return json_response(200, {
+        'gameId': game['id'],
+        'result': game['result'],
+        'winnerId': game['winner_id'],
+        'player1RatingChange': game['player1_rating_change'],
+        'player2RatingChange': game['player2_rating_change'],
+        'unlockedAchievements': unlocked
+    })
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Завершение партии: результат, изменение рейтинга, расчёт ставки одной транзакцией
+    Args: event - dict с httpMethod, headers (X-Auth-Token), body (action, game_id); результат берётся из состояния сервера ходов
+    Returns: HTTP response с изменениями рейтинга и открытыми достижениями или ошибкой
+    '''
+    return router.dispatch(event, context)
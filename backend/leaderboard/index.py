@@ -0,0 +1,142 @@
+import hashlib
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+from shared.http import JSON_HEADERS, Request, Router, dumps, error_response
+from shared.lazy import Refreshing
+from shared.rank import rank_index
+
+LEADERBOARD_TTL = float(os.environ.get('LEADERBOARD_TTL', '30'))
+SNAPSHOT_SIZE = 200
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+
+PLAYER_COLUMNS = 'id, username, rating, total_games, wins, losses, draws'
+
+PAGE_HEADERS = {
+    **JSON_HEADERS,
+    'Access-Control-Expose-Headers': 'ETag',
+    'Cache-Control': f'public, max-age={int(LEADERBOARD_TTL)}'
+}
+NOT_MODIFIED_HEADERS = {'Access-Control-Allow-Origin': '*', 'Access-Control-Expose-Headers': 'ETag'}
+
+router = Router(allow_headers='Content-Type, If-None-Match')
+
+
+def to_entry(row: Tuple[Any, ...], rank: int) -> Dict[str, Any]:
+    player_id, username, rating, total_games, wins, losses, draws = row
+    return {
+        'id': player_id,
+        'username': username,
+        'rating': rating,
+        'rank': rank,
+        'totalGames': total_games,
+        'wins': wins,
+        'losses': losses,
+        'draws': draws,
+        'winRate': round((wins / total_games * 100) if total_games else 0, 1)
+    }
+
+
+def load_snapshot(conn: Any) -> List[Tuple[Any, ...]]:
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""SELECT {PLAYER_COLUMNS} FROM players
+                WHERE rating IS NOT NULL
+                ORDER BY rating DESC, id DESC
+                LIMIT %s""",
+            (SNAPSHOT_SIZE,)
+        )
+        return cur.fetchall()
+
+
+snapshot = Refreshing(load_snapshot, LEADERBOARD_TTL)
+
+
+def page_from_snapshot(rows: List[Tuple[Any, ...]], cursor: Optional[Tuple[int, int]], limit: int) -> Optional[List[Tuple[Any, ...]]]:
+    start = 0
+    if cursor:
+        start = next((i + 1 for i, row in enumerate(rows) if (row[2], row[0]) == cursor), -1)
+        if start < 0:
+            return None
+    if start + limit > len(rows) and len(rows) == SNAPSHOT_SIZE:
+        return None
+    return rows[start:start + limit]
+
+
+def parse_cursor(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    if not value:
+        return None
+    rating, _, player_id = value.partition('.')
+    return int(rating), int(player_id)
+
+
+@router.route('GET')
+def get_page(request: Request) -> Dict[str, Any]:
+    params = request.query
+
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        cursor = parse_cursor(params.get('cursor'))
+    except ValueError:
+        return error_response(400, 'Некорректные limit или cursor')
+
+    # The pooled connection is borrowed only when a cache is stale or the page lies past the snapshot.
+    top = snapshot.peek()
+    if top is None:
+        top = snapshot.reload(request.conn)
+
+    rows = page_from_snapshot(top, cursor, limit)
+    if rows is None:
+        with request.conn.cursor() as cur:
+            if cursor:
+                cur.execute(
+                    f"""SELECT {PLAYER_COLUMNS} FROM players
+                        WHERE rating IS NOT NULL AND (rating, id) < (%s, %s)
+                        ORDER BY rating DESC, id DESC
+                        LIMIT %s""",
+                    (cursor[0], cursor[1], limit)
+                )
+            else:
+                cur.execute(
+                    f"""SELECT {PLAYER_COLUMNS} FROM players
+                        WHERE rating IS NOT NULL
+                        ORDER BY rating DESC, id DESC
+                        LIMIT %s""",
+                    (limit,)
+                )
+            rows = cur.fetchall()
+
+    index = rank_index.peek()
+    if index is None:
+        index = rank_index.reload(request.conn)
+    next_cursor = f'{rows[-1][2]}.{rows[-1][0]}' if len(rows) == limit else None
+    body = dumps({
+        'players': [to_entry(row, index.rank_of(row[2])) for row in rows],
+        'nextCursor': next_cursor
+    })
+    etag = '"' + hashlib.md5(body.encode()).hexdigest() + '"'
+
+    if request.header('If-None-Match') == etag:
+        return {
+            'statusCode': 304,
+            'headers': {**NOT_MODIFIED_HEADERS, 'ETag': etag},
+            'isBase64Encoded': False,
+            'body': ''
+        }
+
+    return {
+        'statusCode': 200,
+        'headers': {**PAGE_HEADERS, 'ETag': etag},
+        'isBase64Encoded': False,
+        'body': body
+    }
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Таблица лидеров с keyset-пагинацией по (rating, id) и ETag-кешированием
+    Args: event - dict с httpMethod, queryStringParameters (limit, cursor), headers (If-None-Match)
+    Returns: HTTP response со страницей игроков и nextCursor или 304 без тела
+    '''
+    return router.dispatch(event, context)
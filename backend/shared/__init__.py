@@ -0,0 +1,7 @@
+'''
+Shared building blocks for the cloud functions in backend/.
+
+Each function is deployed on its own, so backend/bundle.py copies the modules
+a function uses into a shared/ package next to its index.py. Local tools put
+backend/ on sys.path instead; index.py files never touch the path.
+'''
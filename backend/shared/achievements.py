@@ -0,0 +1,136 @@
+'''
+Achievement progress kept in step with the players counters it is defined on.
+
+Every achievements.requirement_type names a players column (REQUIREMENT_COLUMNS).
+The catalogue is read once and cached in-process for ACHIEVEMENT_CACHE_TTL
+seconds. Loading it compiles the catalogue into a requirement-to-column
+table: a LATERAL VALUES list of (achievement_id, counter, target) per player.
+Catalogue.upsert(source) turns that table into one INSERT ... ON CONFLICT
+over a relation holding the affected players' id and counters. Callers embed
+it as a CTE fed by the RETURNING of the statement that changed the counters,
+so game results and purchases update progress in the same statement and
+round trip. Unlocks are permanent: once a row is unlocked it is never
+rewritten, even if the counter later drops (rating, tokens).
+
+Achievements without a mapped requirement are not tracked, but every player
+still gets a zero-progress row for them at registration (Catalogue.seed), and
+loading the catalogue logs which ones they are.
+'''
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from shared.lazy import Refreshing
+
+
+ACHIEVEMENT_CACHE_TTL = float(os.environ.get('ACHIEVEMENT_CACHE_TTL', '300'))
+
+REQUIREMENT_COLUMNS = {
+    'wins': 'wins',
+    'win_streak': 'best_win_streak',
+    'blitz_wins': 'blitz_wins',
+    'tokens': 'tokens',
+    'rating': 'rating',
+    'total_games': 'total_games',
+}
+COUNTER_COLUMNS = tuple(sorted(set(REQUIREMENT_COLUMNS.values())))
+
+# Estimated duration base + 40 * increment, as lichess classifies blitz.
+BLITZ_SECONDS = (180, 480)
+
+
+def is_blitz(time_control: Optional[str]) -> bool:
+    base, _, increment = (time_control or '').partition('+')
+    if not base.isdigit() or not increment.isdigit():
+        return False
+    return BLITZ_SECONDS[0] <= int(base) * 60 + int(increment) * 40 < BLITZ_SECONDS[1]
+
+
+def counter_columns(alias: str) -> str:
+    '''id plus every counter column, for the RETURNING clause that feeds Catalogue.upsert.'''
+    return ', '.join(f'{alias}.{column}' for column in ('id',) + COUNTER_COLUMNS)
+
+
+class Requirement(NamedTuple):
+    achievement_id: int
+    column: str
+    target: int
+
+
+class Catalogue:
+    '''Compiled achievements; those with an unknown requirement type or no target are untracked.'''
+
+    def __init__(self, rows: Iterable[Tuple[int, Optional[str], Optional[int]]]):
+        self.requirements: List[Requirement] = []
+        self.untracked: List[Tuple[int, Optional[str]]] = []
+        for achievement_id, requirement_type, target in rows:
+            if requirement_type in REQUIREMENT_COLUMNS and target is not None:
+                self.requirements.append(Requirement(int(achievement_id), REQUIREMENT_COLUMNS[requirement_type], int(target)))
+            else:
+                self.untracked.append((int(achievement_id), requirement_type))
+        self._statements: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.requirements)
+
+    def upsert(self, source: str) -> str:
+        '''Brings player_achievements in line with the counters in source; returns rows it changed.'''
+        statement = self._statements.get(source)
+        if statement is not None:
+            return statement
+
+        if not self.requirements:
+            statement = "SELECT NULL::integer AS player_id, NULL::integer AS achievement_id, FALSE AS unlocked WHERE FALSE"
+        else:
+            table = ', '.join(
+                f'({requirement.achievement_id}, COALESCE(s.{requirement.column}, 0), {requirement.target})'
+                for requirement in self.requirements
+            )
+            statement = f"""INSERT INTO player_achievements AS pa (player_id, achievement_id, progress, unlocked, unlocked_at)
+                SELECT s.id, r.achievement_id, LEAST(r.value, r.target), r.value >= r.target,
+                       CASE WHEN r.value >= r.target THEN CURRENT_TIMESTAMP END
+                FROM {source} s
+                CROSS JOIN LATERAL (VALUES {table}) AS r(achievement_id, value, target)
+                ON CONFLICT (player_id, achievement_id) DO UPDATE
+                SET progress = EXCLUDED.progress, unlocked = EXCLUDED.unlocked, unlocked_at = EXCLUDED.unlocked_at
+                WHERE NOT pa.unlocked AND (pa.progress IS DISTINCT FROM EXCLUDED.progress OR EXCLUDED.unlocked)
+                RETURNING pa.player_id, pa.achievement_id, pa.unlocked"""
+        self._statements[source] = statement
+        return statement
+
+    def seed(self, source: str) -> str:
+        '''Zero-progress rows for the untracked achievements of the players in source.'''
+        key = 'seed:' + source
+        statement = self._statements.get(key)
+        if statement is not None:
+            return statement
+
+        if not self.untracked:
+            statement = "SELECT NULL::integer AS player_id, NULL::integer AS achievement_id, FALSE AS unlocked WHERE FALSE"
+        else:
+            ids = ', '.join(f'({achievement_id})' for achievement_id, _ in self.untracked)
+            statement = f"""INSERT INTO player_achievements (player_id, achievement_id, progress, unlocked)
+                SELECT s.id, a.achievement_id, 0, FALSE
+                FROM {source} s
+                CROSS JOIN (VALUES {ids}) AS a(achievement_id)
+                ON CONFLICT (player_id, achievement_id) DO NOTHING
+                RETURNING player_id, achievement_id, unlocked"""
+        self._statements[key] = statement
+        return statement
+
+
+def load_catalogue(conn: Any) -> Catalogue:
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, requirement_type, requirement_value FROM achievements ORDER BY id")
+        catalogue = Catalogue(cur.fetchall())
+    if catalogue.untracked:
+        print(json.dumps({
+            'achievements': 'untracked',
+            'ids': [achievement_id for achievement_id, _ in catalogue.untracked],
+            'requirement_types': sorted({str(requirement_type) for _, requirement_type in catalogue.untracked}),
+        }, ensure_ascii=False), flush=True)
+    return catalogue
+
+
+achievement_catalogue = Refreshing(load_catalogue, ACHIEVEMENT_CACHE_TTL)
@@ -0,0 +1,250 @@
+'''
+Expectimax bot for dice chess with Zobrist hashing and iterative deepening.
+
+A turn is up to three moves, each spending one rolled die of the moved
+piece's type; the turn passes once the dice are spent or no die can be used.
+The search is negamax over single moves: consecutive moves of one turn are
+max nodes for the same side, and at every turn boundary the opponent's roll
+is a chance node averaged over the 56 distinct dice multisets. Evaluation
+is material plus the client's centralisation term, updated incrementally
+per move, and the transposition table catches the many move orders that
+reach the same position within a turn.
+'''
+
+import random
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from shared.dice import CHANCE_OUTCOMES
+from shared.engine import (
+    BLACK, KING, PIECE_TYPES, PIECE_VALUES, SQUARES, TYPE_MASK, WHITE,
+    Board, Move, type_mask,
+)
+
+
+WIN_SCORE = 100000.0
+TT_SIZE = 200000
+
+DiceCounts = Tuple[int, ...]
+
+
+class SearchLimits(NamedTuple):
+    time_budget: float
+    max_depth: int
+    noise: float
+
+
+DIFFICULTY_LIMITS: Dict[str, SearchLimits] = {
+    'easy': SearchLimits(time_budget=0.05, max_depth=1, noise=50.0),
+    'medium': SearchLimits(time_budget=0.25, max_depth=3, noise=10.0),
+    'hard': SearchLimits(time_budget=1.0, max_depth=12, noise=0.0),
+}
+
+
+class SearchResult(NamedTuple):
+    move: Optional[Move]
+    score: float
+    depth: int
+    nodes: int
+    elapsed: float
+
+
+def _square_bonus(square: int) -> float:
+    return -(abs((square >> 4) - 3.5) + abs((square & 7) - 3.5)) * 0.3
+
+
+# PIECE_SQUARE[piece][square] is the value of piece standing on square from
+# white's point of view, so a move's delta is two lookups and a subtraction.
+PIECE_SQUARE: List[List[float]] = [[0.0] * 128 for _ in range(16)]
+for _color in (WHITE, BLACK):
+    _sign = 1.0 if _color == WHITE else -1.0
+    for _type in range(1, 7):
+        for _square in SQUARES:
+            PIECE_SQUARE[_color | _type][_square] = _sign * (PIECE_VALUES[_type] * 10 + _square_bonus(_square))
+
+_zobrist = random.Random(20240601)
+ZOBRIST_PIECES: List[List[int]] = [[_zobrist.getrandbits(64) for _ in range(128)] for _ in range(16)]
+ZOBRIST_DICE: List[List[int]] = [[_zobrist.getrandbits(64) for _ in range(4)] for _ in range(7)]
+ZOBRIST_BLACK = _zobrist.getrandbits(64)
+
+
+def dice_counts(dice: Sequence[str]) -> DiceCounts:
+    counts = [0] * 7
+    for piece_type in dice:
+        counts[PIECE_TYPES.index(piece_type) + 1] += 1
+    return tuple(counts)
+
+
+def evaluate(board: Board) -> float:
+    score = 0.0
+    for square in SQUARES:
+        piece = board.squares[square]
+        if piece:
+            score += PIECE_SQUARE[piece][square]
+    return score
+
+
+def position_hash(board: Board) -> int:
+    key = 0
+    for square in SQUARES:
+        piece = board.squares[square]
+        if piece:
+            key ^= ZOBRIST_PIECES[piece][square]
+    return key
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    '''Bounded dict of key -> (depth, value); evicts in insertion order.'''
+
+    def __init__(self, size: int = TT_SIZE):
+        self.size = size
+        self.entries: Dict[int, Tuple[int, float]] = {}
+
+    def get(self, key: int, depth: int) -> Optional[float]:
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] >= depth:
+            return entry[1]
+        return None
+
+    def put(self, key: int, depth: int, value: float) -> None:
+        entries = self.entries
+        if key not in entries and len(entries) >= self.size:
+            del entries[next(iter(entries))]
+        entries[key] = (depth, value)
+
+
+class Searcher:
+    def __init__(self, board: Board, table: Optional[TranspositionTable] = None,
+                 outcomes: Sequence[Tuple[DiceCounts, float]] = CHANCE_OUTCOMES):
+        self.board = board
+        self.table = table if table is not None else TranspositionTable()
+        self.outcomes = outcomes
+        self.nodes = 0
+        self.deadline = float('inf')
+
+    def _tick(self) -> None:
+        self.nodes += 1
+        if not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+    def _key(self, key: int, color: int, counts: DiceCounts) -> int:
+        for piece_type in range(1, 7):
+            key ^= ZOBRIST_DICE[piece_type][counts[piece_type]]
+        return key ^ ZOBRIST_BLACK if color == BLACK else key
+
+    def chance(self, color: int, depth: int, score: float, key: int) -> float:
+        '''Expected value for color before it rolls, from color's point of view.'''
+        if depth <= 0:
+            return score if color == WHITE else -score
+        total = 0.0
+        for counts, weight in self.outcomes:
+            total += weight * self.turn(color, counts, depth, score, key)
+        return total
+
+    def turn(self, color: int, counts: DiceCounts, depth: int, score: float, key: int) -> float:
+        '''Best value for color holding the given unspent dice.'''
+        self._tick()
+        if depth <= 0:
+            return score if color == WHITE else -score
+
+        tt_key = self._key(key, color, counts)
+        cached = self.table.get(tt_key, depth)
+        if cached is not None:
+            return cached
+
+        board = self.board
+        allowed = 0
+        for piece_type in range(1, 7):
+            if counts[piece_type]:
+                allowed |= 1 << piece_type
+        moves = board.moves(color, allowed)
+
+        if not moves:
+            best = -self.chance(color ^ BLACK, depth - 1, score, key)
+        else:
+            best = -WIN_SCORE * 2
+            for move in moves:
+                value = self._child(move, color, counts, depth, score, key)
+                if value > best:
+                    best = value
+
+        self.table.put(tt_key, depth, best)
+        return best
+
+    def _child(self, move: Move, color: int, counts: DiceCounts, depth: int, score: float, key: int) -> float:
+        board = self.board
+        frm = move & 127
+        to = move >> 7
+        piece = board.squares[frm]
+        captured = board.make(move)
+        try:
+            if captured & TYPE_MASK == KING:
+                return WIN_SCORE + depth
+
+            score += PIECE_SQUARE[piece][to] - PIECE_SQUARE[piece][frm]
+            key ^= ZOBRIST_PIECES[piece][frm] ^ ZOBRIST_PIECES[piece][to]
+            if captured:
+                score -= PIECE_SQUARE[captured][to]
+                key ^= ZOBRIST_PIECES[captured][to]
+
+            remaining = list(counts)
+            remaining[piece & TYPE_MASK] -= 1
+            if any(remaining):
+                return self.turn(color, tuple(remaining), depth - 1, score, key)
+            return -self.chance(color ^ BLACK, depth - 1, score, key)
+        finally:
+            board.unmake(move, captured)
+
+    def root(self, color: int, counts: DiceCounts, depth: int) -> List[Tuple[float, Move]]:
+        score = evaluate(self.board)
+        key = position_hash(self.board)
+        moves = self.board.moves(color, type_mask(t for t in range(1, 7) if counts[t]))
+        return [(self._child(move, color, counts, depth, score, key), move) for move in moves]
+
+
+def choose_move(
+    board: Board,
+    color: int,
+    dice: Sequence[str],
+    difficulty: str = 'medium',
+    table: Optional[TranspositionTable] = None,
+    rng: Optional[random.Random] = None,
+    time_budget: Optional[float] = None,
+) -> SearchResult:
+    '''Picks the next move for color holding the unspent dice, within the difficulty's budget.'''
+    limits = DIFFICULTY_LIMITS.get(difficulty, DIFFICULTY_LIMITS['medium'])
+    if time_budget is not None:
+        limits = limits._replace(time_budget=min(limits.time_budget, time_budget))
+    rng = rng or random.Random()
+    counts = dice_counts(dice)
+    searcher = Searcher(board, table)
+    started = time.perf_counter()
+
+    best: List[Tuple[float, Move]] = []
+    completed = 0
+    searcher.deadline = started + limits.time_budget
+    for depth in range(1, limits.max_depth + 1):
+        try:
+            scored = searcher.root(color, counts, depth)
+        except SearchTimeout:
+            break
+        best = scored
+        completed = depth
+        if not scored or time.perf_counter() - started > limits.time_budget / 2:
+            break
+
+    if not best:
+        # Out of time before depth 1 finished: a static one-ply pick still beats no move.
+        searcher.deadline = float('inf')
+        best = searcher.root(color, counts, 0)
+
+    elapsed = time.perf_counter() - started
+    if not best:
+        return SearchResult(None, 0.0, completed, searcher.nodes, elapsed)
+
+    score, move = max(best, key=lambda item: item[0] + rng.random() * limits.noise)
+    return SearchResult(move, score, completed, searcher.nodes, elapsed)
@@ -0,0 +1,155 @@
+'''
+Batch bot-move service that fans searches out over a process pool.
+
+Positions cross the process boundary as 36-byte strings (two 4-bit pieces
+per byte, then side to move and up to three dice) instead of JSON boards.
+Every job carries an absolute deadline: a worker that picks a job up late
+shortens its search budget to what is left, or skips it if nothing is left,
+and the dispatcher cancels jobs still queued once their deadline passes.
+Each worker process keeps its own transposition table between jobs.
+'''
+
+import os
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from shared.bot import TranspositionTable, choose_move
+from shared.engine import BLACK, PIECE_TYPES, SQUARES, WHITE, Board, Move
+
+
+POSITION_SIZE = 36
+BOT_POOL_WORKERS = int(os.environ.get('BOT_POOL_WORKERS', '0')) or os.cpu_count() or 1
+
+
+class BotJob(NamedTuple):
+    game_id: int
+    position: bytes
+    difficulty: str
+    deadline: float
+
+
+class BotReply(NamedTuple):
+    game_id: int
+    move: Optional[Move]
+    status: str
+    queue_wait: float
+    search_time: float
+    depth: int
+    nodes: int
+
+
+def encode_position(board: Board, color: int, dice: Sequence[str]) -> bytes:
+    squares = board.squares
+    packed = bytearray(POSITION_SIZE)
+    for index in range(0, 64, 2):
+        packed[index >> 1] = squares[SQUARES[index]] | squares[SQUARES[index + 1]] << 4
+    packed[32] = color
+    for slot, piece_type in enumerate(dice[:3]):
+        packed[33 + slot] = PIECE_TYPES.index(piece_type) + 1
+    return bytes(packed)
+
+
+def decode_position(packed: bytes) -> Tuple[Board, int, List[str]]:
+    board = Board()
+    for index in range(64):
+        piece = packed[index >> 1] >> (index & 1) * 4 & 15
+        if piece:
+            board.put(SQUARES[index], piece)
+    color = BLACK if packed[32] == BLACK else WHITE
+    dice = [PIECE_TYPES[face - 1] for face in packed[33:36] if face]
+    return board, color, dice
+
+
+_worker_table: Optional[TranspositionTable] = None
+
+
+def _search(job: BotJob, submitted_at: float) -> BotReply:
+    global _worker_table
+    started = time.time()
+    queue_wait = started - submitted_at
+    remaining = job.deadline - started
+    if remaining <= 0:
+        return BotReply(job.game_id, None, 'expired', queue_wait, 0.0, 0, 0)
+
+    if _worker_table is None:
+        _worker_table = TranspositionTable()
+    board, color, dice = decode_position(job.position)
+    result = choose_move(board, color, dice, job.difficulty, _worker_table, time_budget=remaining)
+    status = 'ok' if result.move is not None else 'no_moves'
+    return BotReply(job.game_id, result.move, status, queue_wait, result.elapsed, result.depth, result.nodes)
+
+
+class BotServiceStats:
+    '''Running counters for sizing nodes: throughput and queue-wait latency.'''
+
+    def __init__(self) -> None:
+        self.completed = 0
+        self.cancelled = 0
+        self.busy_seconds = 0.0
+        self.queue_waits: List[float] = []
+
+    def record(self, replies: Sequence[BotReply], elapsed: float) -> None:
+        self.busy_seconds += elapsed
+        for reply in replies:
+            if reply.status in ('ok', 'no_moves'):
+                self.completed += 1
+                self.queue_waits.append(reply.queue_wait)
+            else:
+                self.cancelled += 1
+
+    def summary(self) -> Dict[str, float]:
+        waits = sorted(self.queue_waits) or [0.0]
+        return {
+            'completed': self.completed,
+            'cancelled': self.cancelled,
+            'positions_per_sec': self.completed / self.busy_seconds if self.busy_seconds else 0.0,
+            'queue_wait_p50_ms': statistics.median(waits) * 1000,
+            'queue_wait_p95_ms': waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000,
+        }
+
+
+class BotService:
+    def __init__(self, workers: int = BOT_POOL_WORKERS):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.stats = BotServiceStats()
+
+    def run_batch(self, jobs: Sequence[BotJob]) -> List[BotReply]:
+        '''Searches every job in parallel; replies come back in job order.'''
+        started = time.time()
+        futures: Dict[Future, int] = {
+            self.executor.submit(_search, job, started): index for index, job in enumerate(jobs)
+        }
+        replies: List[Optional[BotReply]] = [None] * len(jobs)
+
+        pending = set(futures)
+        while pending:
+            now = time.time()
+            for future in [f for f in pending if jobs[futures[f]].deadline <= now]:
+                if future.cancel():
+                    index = futures[future]
+                    replies[index] = BotReply(jobs[index].game_id, None, 'cancelled', now - started, 0.0, 0, 0)
+                    pending.discard(future)
+            if not pending:
+                break
+
+            # Running jobs past their deadline cannot be cancelled; their search stops on its
+            # own, so only deadlines still ahead bound the wait.
+            upcoming = [jobs[futures[f]].deadline for f in pending if jobs[futures[f]].deadline > now]
+            timeout = max(0.0, min(upcoming) - time.time()) + 0.01 if upcoming else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                try:
+                    replies[index] = future.result()
+                except Exception:
+                    replies[index] = BotReply(jobs[index].game_id, None, 'failed', 0.0, 0.0, 0, 0)
+
+        ordered = [reply for reply in replies if reply is not None]
+        self.stats.record(ordered, time.time() - started)
+        return ordered
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
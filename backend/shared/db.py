@@ -0,0 +1,146 @@
+'''
+Process-wide Postgres connection pool reused across warm invocations.
+
+The pool is created at import time but opens connections lazily, so a cold
+start costs one handshake and every following invocation on the same instance
+reuses the socket. Concurrency is capped by a semaphore sized to DB_POOL_MAX,
+which keeps scale-out bursts below Postgres max_connections. psycopg2 itself
+is imported on the first connect, not when a function module loads.
+'''
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+from shared.lazy import lazy_module
+
+psycopg2 = lazy_module('psycopg2')
+extensions = lazy_module('psycopg2.extensions')
+
+
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', '4'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+DB_POOL_CHECK_AFTER = float(os.environ.get('DB_POOL_CHECK_AFTER', '30'))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', '300'))
+
+
+class PoolTimeout(Exception):
+    '''Raised when no connection slot frees up within the pool timeout.'''
+
+
+class ConnectionPool:
+    '''
+    LIFO pool of psycopg2 connections with stale-connection health checks.
+
+    Connections idle longer than check_after are probed with SELECT 1 before
+    reuse; connections idle longer than max_idle are dropped outright, since
+    the server or a NAT in between has most likely closed them already.
+    '''
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        maxconn: int = DB_POOL_MAX,
+        timeout: float = DB_POOL_TIMEOUT,
+        check_after: float = DB_POOL_CHECK_AFTER,
+        max_idle: float = DB_POOL_MAX_IDLE,
+        connection_factory: Any = None,
+    ):
+        self.dsn = dsn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self.connection_factory = connection_factory
+        self._idle: List[Tuple[Any, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def _connect(self) -> Any:
+        return psycopg2.connect(
+            self.dsn or os.environ.get('DATABASE_URL'),
+            connection_factory=self.connection_factory,
+        )
+
+    @staticmethod
+    def _is_alive(conn: Any) -> bool:
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _discard(conn: Any) -> None:
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self) -> Any:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout('Connection pool exhausted')
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    return self._connect()
+
+                conn, released_at = item
+                idle_for = time.monotonic() - released_at
+                if conn.closed or idle_for > self.max_idle:
+                    self._discard(conn)
+                    continue
+                if idle_for > self.check_after and not self._is_alive(conn):
+                    self._discard(conn)
+                    continue
+                return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn: Any, close: bool = False) -> None:
+        try:
+            if not close and not conn.closed:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+        except psycopg2.Error:
+            close = True
+
+        try:
+            if close or conn.closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    def closeall(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+pool = ConnectionPool()
@@ -0,0 +1,84 @@
+'''
+Precomputed outcome tables for a roll of three DICE_PIECE_MAP dice.
+
+The 216 ordered rolls collapse into 56 distinct multisets. ROLL_OUTCOMES
+lists each multiset once with its probability (orderings / 216), its
+per-type counts indexed like engine piece types, and the bitmask of piece
+types it allows to move. Chance nodes and analytics should iterate this
+table rather than itertools.product over the faces.
+'''
+
+import itertools
+from math import factorial
+from typing import Dict, List, NamedTuple, Tuple
+
+from shared.engine import ALL_TYPES, PIECE_TYPES, Board
+
+
+DICE_PER_TURN = 3
+
+
+class RollOutcome(NamedTuple):
+    faces: Tuple[str, ...]
+    counts: Tuple[int, ...]
+    mask: int
+    probability: float
+
+
+def _orderings(counts: Tuple[int, ...]) -> int:
+    result = factorial(DICE_PER_TURN)
+    for count in counts:
+        result //= factorial(count)
+    return result
+
+
+def _build_outcomes() -> Tuple[RollOutcome, ...]:
+    outcomes = []
+    total = len(PIECE_TYPES) ** DICE_PER_TURN
+    for combo in itertools.combinations_with_replacement(range(1, len(PIECE_TYPES) + 1), DICE_PER_TURN):
+        counts = [0] * (len(PIECE_TYPES) + 1)
+        mask = 0
+        for piece_type in combo:
+            counts[piece_type] += 1
+            mask |= 1 << piece_type
+        outcomes.append(RollOutcome(
+            faces=tuple(PIECE_TYPES[t - 1] for t in combo),
+            counts=tuple(counts),
+            mask=mask,
+            probability=_orderings(tuple(counts)) / total,
+        ))
+    return tuple(outcomes)
+
+
+ROLL_OUTCOMES: Tuple[RollOutcome, ...] = _build_outcomes()
+
+# (counts, probability) pairs in the shape Searcher.chance iterates.
+CHANCE_OUTCOMES: Tuple[Tuple[Tuple[int, ...], float], ...] = tuple(
+    (outcome.counts, outcome.probability) for outcome in ROLL_OUTCOMES
+)
+
+# Probability that a roll contains at least one of the types in a mask, for
+# every subset of the six piece types.
+HIT_PROBABILITY: Dict[int, float] = {
+    mask: sum(o.probability for o in ROLL_OUTCOMES if o.mask & mask)
+    for mask in range(0, ALL_TYPES + 1, 2)
+}
+
+
+def movable_types(board: Board, color: int) -> int:
+    '''Bitmask of piece types of color that have at least one move.'''
+    mask = 0
+    for piece_type in range(1, len(PIECE_TYPES) + 1):
+        if board.moves(color, 1 << piece_type):
+            mask |= 1 << piece_type
+    return mask
+
+
+def legal_move_probability(board: Board, color: int) -> float:
+    '''Chance that color's next roll allows at least one move.'''
+    return HIT_PROBABILITY[movable_types(board, color)]
+
+
+def outcomes_for(mask: int) -> List[RollOutcome]:
+    '''Roll outcomes that let at least one of the types in mask move.'''
+    return [outcome for outcome in ROLL_OUTCOMES if outcome.mask & mask]
@@ -0,0 +1,218 @@
+'''
+Authoritative dice-chess move generation on a 0x88 mailbox board.
+
+Rules mirror src/pages/Game.tsx: no check, castling, en passant or promotion;
+a pawn may double-step from its start row; capturing the king ends the game.
+Squares are row * 16 + col with row 0 being rank 8, the same orientation as
+the client's board[row][col]. Pieces are small ints (type | colour) and
+moves are packed as from | to << 7, so search code never allocates per move.
+'''
+
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+WHITE, BLACK = 0, 8
+TYPE_MASK = 7
+
+# Same order as DICE_PIECE_MAP in Game.tsx, so die face i maps to type i + 1.
+PIECE_TYPES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+PIECE_VALUES = (0, 1, 3, 3, 5, 9, 100)
+COLORS = {'white': WHITE, 'black': BLACK}
+ALL_TYPES = sum(1 << t for t in range(PAWN, KING + 1))
+
+KNIGHT_STEPS = (-33, -31, -18, -14, 14, 18, 31, 33)
+KING_STEPS = (-17, -16, -15, -1, 1, 15, 16, 17)
+BISHOP_DIRS = (-17, -15, 15, 17)
+ROOK_DIRS = (-16, -1, 1, 16)
+QUEEN_DIRS = BISHOP_DIRS + ROOK_DIRS
+SLIDER_DIRS = {BISHOP: BISHOP_DIRS, ROOK: ROOK_DIRS, QUEEN: QUEEN_DIRS}
+
+SQUARES = tuple(row * 16 + col for row in range(8) for col in range(8))
+BACK_ROW = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+
+Move = int
+Rows = Sequence[Sequence[Optional[Tuple[str, str]]]]
+
+
+def type_mask(types: Iterable[Union[str, int]]) -> int:
+    mask = 0
+    for piece_type in types:
+        if isinstance(piece_type, str):
+            piece_type = PIECE_TYPES.index(piece_type) + 1
+        mask |= 1 << piece_type
+    return mask
+
+
+def move_from(move: Move) -> int:
+    return move & 127
+
+
+def move_to(move: Move) -> int:
+    return move >> 7
+
+
+def make_move(frm: int, to: int) -> Move:
+    return frm | to << 7
+
+
+def square_name(square: int) -> str:
+    return f'{chr(97 + (square & 7))}{8 - (square >> 4)}'
+
+
+def parse_square(name: str) -> int:
+    return (8 - int(name[1])) * 16 + ord(name[0]) - 97
+
+
+class Board:
+    '''Mailbox plus per-colour piece sets, updated by make/unmake in place.'''
+
+    __slots__ = ('squares', 'pieces')
+
+    def __init__(self) -> None:
+        self.squares: List[int] = [0] * 128
+        self.pieces: Tuple[Set[int], Set[int]] = (set(), set())
+
+    @classmethod
+    def initial(cls) -> 'Board':
+        board = cls()
+        for col, piece_type in enumerate(BACK_ROW):
+            board.put(col, BLACK | piece_type)
+            board.put(16 + col, BLACK | PAWN)
+            board.put(96 + col, WHITE | PAWN)
+            board.put(112 + col, WHITE | piece_type)
+        return board
+
+    @classmethod
+    def from_rows(cls, rows: Rows) -> 'Board':
+        '''Builds a board from 8x8 rows of (type, colour) pairs or None.'''
+        board = cls()
+        for row, cells in enumerate(rows):
+            for col, cell in enumerate(cells):
+                if cell:
+                    piece_type, color = cell
+                    board.put(row * 16 + col, COLORS[color] | PIECE_TYPES.index(piece_type) + 1)
+        return board
+
+    def to_rows(self) -> List[List[Optional[Tuple[str, str]]]]:
+        rows: List[List[Optional[Tuple[str, str]]]] = []
+        for row in range(8):
+            cells: List[Optional[Tuple[str, str]]] = []
+            for col in range(8):
+                piece = self.squares[row * 16 + col]
+                cells.append(
+                    (PIECE_TYPES[(piece & TYPE_MASK) - 1], 'black' if piece & BLACK else 'white') if piece else None
+                )
+            rows.append(cells)
+        return rows
+
+    def copy(self) -> 'Board':
+        board = Board()
+        board.squares = self.squares[:]
+        board.pieces = (set(self.pieces[0]), set(self.pieces[1]))
+        return board
+
+    def put(self, square: int, piece: int) -> None:
+        old = self.squares[square]
+        if old:
+            self.pieces[old >> 3].discard(square)
+        self.squares[square] = piece
+        if piece:
+            self.pieces[piece >> 3].add(square)
+
+    def moves(self, color: int, allowed: int = ALL_TYPES) -> List[Move]:
+        '''Pseudo-legal moves for pieces whose type bit is set in allowed.'''
+        squares = self.squares
+        out: List[Move] = []
+        append = out.append
+
+        for frm in self.pieces[color >> 3]:
+            piece_type = squares[frm] & TYPE_MASK
+            if not allowed >> piece_type & 1:
+                continue
+
+            if piece_type == PAWN:
+                step = -16 if color == WHITE else 16
+                to = frm + step
+                if not to & 0x88:
+                    if not squares[to]:
+                        append(frm | to << 7)
+                        if frm >> 4 == (6 if color == WHITE else 1) and not squares[to + step]:
+                            append(frm | (to + step) << 7)
+                    for target in (to - 1, to + 1):
+                        if not target & 0x88:
+                            victim = squares[target]
+                            if victim and victim & BLACK != color:
+                                append(frm | target << 7)
+
+            elif piece_type == KNIGHT or piece_type == KING:
+                for step in KNIGHT_STEPS if piece_type == KNIGHT else KING_STEPS:
+                    to = frm + step
+                    if not to & 0x88:
+                        victim = squares[to]
+                        if not victim or victim & BLACK != color:
+                            append(frm | to << 7)
+
+            else:
+                for step in SLIDER_DIRS[piece_type]:
+                    to = frm + step
+                    while not to & 0x88:
+                        victim = squares[to]
+                        if victim:
+                            if victim & BLACK != color:
+                                append(frm | to << 7)
+                            break
+                        append(frm | to << 7)
+                        to += step
+
+        return out
+
+    def make(self, move: Move) -> int:
+        '''Applies move and returns the captured piece (0 if none) for unmake.'''
+        frm = move & 127
+        to = move >> 7
+        squares = self.squares
+        piece = squares[frm]
+        captured = squares[to]
+        if captured:
+            self.pieces[captured >> 3].discard(to)
+        own = self.pieces[piece >> 3]
+        own.discard(frm)
+        own.add(to)
+        squares[to] = piece
+        squares[frm] = 0
+        return captured
+
+    def unmake(self, move: Move, captured: int) -> None:
+        frm = move & 127
+        to = move >> 7
+        squares = self.squares
+        piece = squares[to]
+        own = self.pieces[piece >> 3]
+        own.discard(to)
+        own.add(frm)
+        squares[frm] = piece
+        squares[to] = captured
+        if captured:
+            self.pieces[captured >> 3].add(to)
+
+    def has_king(self, color: int) -> bool:
+        return any(self.squares[sq] & TYPE_MASK == KING for sq in self.pieces[color >> 3])
+
+
+def perft(board: Board, color: int, depth: int, allowed: int = ALL_TYPES) -> int:
+    '''Counts move sequences of the given length; king captures end a line.'''
+    if depth == 0:
+        return 1
+    moves = board.moves(color, allowed)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        captured = board.make(move)
+        if captured & TYPE_MASK == KING:
+            nodes += 1
+        else:
+            nodes += perft(board, color ^ BLACK, depth - 1, allowed)
+        board.unmake(move, captured)
+    return nodes
@@ -0,0 +1,168 @@
+'''
+Keep-alive YooKassa client with timeouts, bounded retries and a circuit breaker.
+
+One requests.Session per process keeps the TLS connection to the gateway warm
+across invocations. Retries reuse the caller's Idempotence-Key, which is what
+makes retrying a POST to /payments safe. After GATEWAY_BREAKER_FAILURES
+consecutive failures the breaker opens and calls fail fast with
+CircuitOpenError for GATEWAY_BREAKER_RESET seconds, then a single trial call
+decides whether it closes again. YOOKASSA_API_URL can point at a local stub.
+'''
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from shared.lazy import Lazy, lazy_module
+
+requests = lazy_module('requests')
+
+
+YOOKASSA_API_URL = os.environ.get('YOOKASSA_API_URL', 'https://api.yookassa.ru/v3')
+GATEWAY_CONNECT_TIMEOUT = float(os.environ.get('GATEWAY_CONNECT_TIMEOUT', '3.05'))
+GATEWAY_READ_TIMEOUT = float(os.environ.get('GATEWAY_READ_TIMEOUT', '10'))
+GATEWAY_RETRIES = int(os.environ.get('GATEWAY_RETRIES', '2'))
+GATEWAY_BREAKER_FAILURES = int(os.environ.get('GATEWAY_BREAKER_FAILURES', '5'))
+GATEWAY_BREAKER_RESET = float(os.environ.get('GATEWAY_BREAKER_RESET', '30'))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class GatewayError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None, details: str = ''):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class CircuitOpenError(GatewayError):
+    pass
+
+
+class CircuitBreaker:
+    '''Closed -> open after N consecutive failures -> half-open after reset_after.'''
+
+    def __init__(self, failures: int = GATEWAY_BREAKER_FAILURES, reset_after: float = GATEWAY_BREAKER_RESET):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+class PaymentGateway:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        connect_timeout: float = GATEWAY_CONNECT_TIMEOUT,
+        read_timeout: float = GATEWAY_READ_TIMEOUT,
+        retries: int = GATEWAY_RETRIES,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = (base_url or YOOKASSA_API_URL).rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self._session: Lazy[Any] = Lazy(self._build_session)
+
+    @property
+    def session(self) -> Any:
+        return self._session.get()
+
+    def _build_session(self) -> Any:
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=0.2,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'POST'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=4))
+        session.mount('http://', HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=4))
+        return session
+
+    def create_payment(self, payload: Dict[str, Any], idempotence_key: str) -> Dict[str, Any]:
+        shop_id = os.environ.get('YOOKASSA_SHOP_ID')
+        secret_key = os.environ.get('YOOKASSA_SECRET_KEY')
+        if not shop_id or not secret_key:
+            raise GatewayError('Payment system not configured')
+
+        if not self.breaker.allow():
+            raise CircuitOpenError('Payment gateway is unavailable')
+
+        # The breaker hears exactly one outcome per allowed call, whatever is raised,
+        # so a half-open trial can never be left running.
+        healthy = False
+        try:
+            try:
+                response = self.session.post(
+                    f'{self.base_url}/payments',
+                    json=payload,
+                    auth=(shop_id, secret_key),
+                    headers={'Idempotence-Key': idempotence_key},
+                    timeout=self.timeout,
+                )
+            except requests.RequestException as e:
+                raise GatewayError('Payment gateway request failed', details=str(e))
+
+            if response.status_code in (200, 201):
+                try:
+                    payment = response.json()
+                except ValueError:
+                    payment = None
+                if not isinstance(payment, dict):
+                    raise GatewayError('Payment gateway returned an invalid response', response.status_code, response.text[:500])
+                healthy = True
+                return payment
+
+            # A rejected request (4xx other than 429) still shows the gateway is up.
+            healthy = response.status_code < 500 and response.status_code != 429
+            raise GatewayError('Payment creation failed', response.status_code, response.text)
+        finally:
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+gateway = PaymentGateway()
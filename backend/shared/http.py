@@ -0,0 +1,241 @@
+'''
+Table-driven routing and response helpers shared by every cloud function.
+
+A Router maps (method, action) to a route function. Preflight, 405 and
+unknown-action responses are built once per router, and error responses are
+memoised by (status, message), so the hot paths return prebuilt dicts.
+Response dicts and their headers are shared between requests: copy before
+adding headers. Bodies are serialised with orjson when it is installed.
+The request's pooled connection is borrowed on first use and returned after
+dispatch, and routes declared with auth=True get request.player_id resolved
+through shared.sessions. Session handling and orjson are imported on first
+use, since loading them costs more than a cold preflight or a public GET is
+worth. With TRACING_ENABLED=1 every non-preflight request is traced through
+shared.tracing and answered with a Server-Timing header.
+'''
+
+import json
+import time
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from shared.db import pool
+from shared.lazy import Lazy, lazy_module
+from shared import tracing
+from shared.tracing import TRACING_ENABLED
+
+session_store = lazy_module('shared.sessions')
+
+if TRACING_ENABLED:
+    pool.connection_factory = tracing.traced_connection
+
+
+Response = Dict[str, Any]
+Route = Callable[['Request'], Response]
+
+JSON_HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _load_dumps() -> Callable[[Any], str]:
+    try:
+        import orjson
+    except ImportError:
+        return lambda data: json.dumps(data, default=_default)
+    return lambda data: orjson.dumps(data, default=_default).decode()
+
+
+_dumps = Lazy(_load_dumps)
+
+
+def dumps(data: Any) -> str:
+    if TRACING_ENABLED:
+        trace = tracing.current()
+        if trace is not None:
+            started = time.perf_counter()
+            body = _dumps.get()(data)
+            trace.add('serialize', started)
+            return body
+    return _dumps.get()(data)
+
+
+def json_response(status: int, data: Any, headers: Dict[str, str] = JSON_HEADERS) -> Response:
+    return {'statusCode': status, 'headers': headers, 'isBase64Encoded': False, 'body': dumps(data)}
+
+
+@lru_cache(maxsize=256)
+def error_response(status: int, message: str) -> Response:
+    return json_response(status, {'error': message})
+
+
+class RowMapper:
+    '''
+    Maps tuple rows from a plain cursor straight to camelCase DTOs.
+
+    fields are (json_key, sql_expression) pairs; columns is the SELECT list
+    to put in the query, so column order and keys cannot drift apart.
+    '''
+
+    def __init__(self, fields: Sequence[Tuple[str, str]]):
+        self.keys = tuple(key for key, _ in fields)
+        self.columns = ', '.join(column for _, column in fields)
+
+    def one(self, row: Optional[Sequence[Any]]) -> Optional[Dict[str, Any]]:
+        return dict(zip(self.keys, row)) if row is not None else None
+
+    def many(self, rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+
+class Request:
+    __slots__ = ('event', 'context', 'method', 'headers', 'player_id', 'trace', '_body', '_conn')
+
+    def __init__(self, event: Dict[str, Any], context: Any):
+        self.event = event
+        self.context = context
+        self.method: str = event.get('httpMethod', 'GET')
+        self.headers: Dict[str, str] = event.get('headers') or {}
+        self.player_id: Optional[int] = None
+        self.trace: Optional[tracing.Trace] = None
+        self._body: Optional[Dict[str, Any]] = None
+        self._conn: Any = None
+
+    @property
+    def body(self) -> Dict[str, Any]:
+        if self._body is None:
+            self._body = json.loads(self.event.get('body') or '{}')
+        return self._body
+
+    @property
+    def query(self) -> Dict[str, str]:
+        return self.event.get('queryStringParameters') or {}
+
+    def header(self, name: str) -> Optional[str]:
+        return self.headers.get(name) or self.headers.get(name.lower())
+
+    @property
+    def token(self) -> Optional[str]:
+        return self.header('X-Auth-Token')
+
+    @property
+    def conn(self) -> Any:
+        if self._conn is None:
+            started = time.perf_counter()
+            self._conn = pool.getconn()
+            if self.trace is not None:
+                self.trace.add('connect', started)
+        return self._conn
+
+    def release(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            pool.putconn(conn)
+
+
+class Router:
+    def __init__(
+        self,
+        allow_headers: str = 'Content-Type, X-Auth-Token',
+        unknown_action: str = 'Неизвестное действие',
+    ):
+        self.allow_headers = allow_headers
+        self.routes: Dict[Tuple[str, Optional[str]], Tuple[Route, bool]] = {}
+        self.action_methods: set = set()
+        self.unknown_action = error_response(400, unknown_action)
+        self.method_not_allowed = error_response(405, 'Method not allowed')
+        self.preflight: Response = {}
+        self._build_preflight()
+
+    def _build_preflight(self) -> None:
+        methods = sorted({method for method, _ in self.routes}) + ['OPTIONS']
+        self.preflight = {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': ', '.join(methods),
+                'Access-Control-Allow-Headers': self.allow_headers,
+                'Access-Control-Max-Age': '86400'
+            },
+            'isBase64Encoded': False,
+            'body': ''
+        }
+
+    def route(self, method: str, action: Optional[str] = None, auth: bool = False) -> Callable[[Route], Route]:
+        def register(fn: Route) -> Route:
+            self.routes[(method, action)] = (fn, auth)
+            if action is not None:
+                self.action_methods.add(method)
+            self._build_preflight()
+            return fn
+        return register
+
+    def dispatch(self, event: Dict[str, Any], context: Any) -> Response:
+        if event.get('httpMethod', 'GET') == 'OPTIONS':
+            return self.preflight
+
+        request = Request(event, context)
+        if not TRACING_ENABLED:
+            try:
+                return self._dispatch(request)
+            finally:
+                request.release()
+
+        trace = request.trace = tracing.begin(request.method)
+        try:
+            response = self._dispatch(request)
+        finally:
+            request.release()
+            tracing.end()
+        total_ms = trace.total_ms
+        trace.log(response['statusCode'], total_ms)
+        return trace.annotate(response, total_ms)
+
+    def _dispatch(self, request: Request) -> Response:
+        method = request.method
+        trace = request.trace
+        try:
+            if method in self.action_methods:
+                try:
+                    action = request.body.get('action')
+                except ValueError:
+                    return error_response(400, 'Некорректный JSON')
+                entry = self.routes.get((method, action))
+                if entry is None:
+                    return self.unknown_action
+                if trace is not None:
+                    trace.route = f'{method} {action}'
+            else:
+                entry = self.routes.get((method, None))
+                if entry is None:
+                    return self.method_not_allowed
+
+            fn, auth = entry
+            if auth:
+                if not request.token:
+                    return error_response(401, 'Требуется аутентификация')
+                conn = request.conn
+                started = time.perf_counter()
+                request.player_id = session_store.sessions.resolve(conn, request.token)
+                if trace is not None:
+                    trace.add('auth', started)
+                if not request.player_id:
+                    return error_response(401, 'Неверный или истекший токен')
+
+            if trace is None:
+                return fn(request)
+            started = time.perf_counter()
+            response = fn(request)
+            trace.add('handler', started)
+            return response
+
+        except Exception as e:
+            if trace is not None:
+                trace.error = f'{type(e).__name__}: {e}'
+            return json_response(500, {'error': str(e)})
@@ -0,0 +1,103 @@
+'''
+Lazy initialisation helpers that keep heavy work off the cold-start path.
+
+lazy_module defers an import until the first attribute access, so a function
+that answers an OPTIONS preflight or a validation error never loads the DB
+driver or the HTTP stack. Lazy wraps any expensive object (an HTTP session, a
+parsed setting) and builds it once, thread-safely, on first get(). Refreshing
+does the same for a value read from the database, and reloads it once it is
+older than its ttl.
+'''
+
+import importlib
+import threading
+import time
+from types import ModuleType
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+def lazy_module(name: str) -> Any:
+    return LazyModule(name)
+
+
+class Lazy(Generic[T]):
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._value = self._factory()
+                    self._ready = True
+        return self._value  # type: ignore[return-value]
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def reset(self) -> None:
+        with self._lock:
+            self._value = None
+            self._ready = False
+
+
+class Refreshing(Generic[T]):
+    '''Process-wide value from load(conn) that reloads itself once it is older than ttl.'''
+
+    def __init__(self, load: Callable[[Any], T], ttl: float):
+        self._load = load
+        self.ttl = ttl
+        self._value: Optional[T] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def peek(self) -> Optional[T]:
+        '''The value while it is fresh, else None; never touches the database.'''
+        value, loaded_at = self._value, self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl:
+            return None
+        return value
+
+    def get(self, conn: Any) -> T:
+        value = self.peek()
+        if value is None:
+            value = self.reload(conn)
+        return value
+
+    def reload(self, conn: Any) -> T:
+        value = self._load(conn)
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+        return value
+
+    def update(self, change: Callable[[T], T]) -> None:
+        '''Applies a local write to the loaded value without waiting for the next reload.'''
+        with self._lock:
+            if self._loaded_at is not None:
+                self._value = change(self._value)  # type: ignore[arg-type]
@@ -0,0 +1,248 @@
+'''
+PvP matchmaking with rating-sorted queues, run inside the relay process.
+
+Waiting players live in one RatingQueue per (time_control, bet_amount), a
+SortedList ordered by rating, so a join pairs against its nearest neighbours
+in O(log n) instead of scanning games WHERE status = 'waiting'. A ticket's
+acceptable rating gap starts at MATCH_WINDOW_BASE and widens by
+MATCH_WINDOW_GROWTH points per second waited, up to MATCH_WINDOW_MAX; two
+tickets pair when their gap fits the wider of their two windows. sweep()
+re-checks adjacent tickets so widened windows pair up without a new join; it
+is linear in the queue size, so it runs at most once per MATCH_SWEEP_INTERVAL.
+
+The queue has to see every waiting player, so it lives in the single
+long-lived relay process (shared.relay) rather than in a cloud function,
+whose instances would each hold a private queue. A pair is written to games
+as an 'active' row, with the relay's opening state and first roll, before
+either player is told about it: join inserts its match straight away, and
+sweep's pairs go in as one multi-row INSERT of up to MATCH_BATCH_SIZE rows. If the INSERT fails, both tickets go back into
+the queue, so nothing is lost that was not yet announced.
+'''
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sortedcontainers import SortedList
+
+from shared.sessions import TTLCache
+
+
+MATCH_WINDOW_BASE = int(os.environ.get('MATCH_WINDOW_BASE', '50'))
+MATCH_WINDOW_GROWTH = float(os.environ.get('MATCH_WINDOW_GROWTH', '10'))
+MATCH_WINDOW_MAX = int(os.environ.get('MATCH_WINDOW_MAX', '400'))
+MATCH_SWEEP_INTERVAL = float(os.environ.get('MATCH_SWEEP_INTERVAL', '1'))
+MATCH_BATCH_SIZE = int(os.environ.get('MATCH_BATCH_SIZE', '50'))
+MATCH_RESULT_TTL = float(os.environ.get('MATCH_RESULT_TTL', '120'))
+
+QueueKey = Tuple[str, int]
+# game_data and move_log a new game starts with, so its row already carries the relay's state
+Opening = Tuple[str, bytes]
+
+
+class Ticket(NamedTuple):
+    rating: int
+    enqueued_at: float
+    player_id: int
+    key: QueueKey
+
+
+class Match(NamedTuple):
+    player1: Ticket
+    player2: Ticket
+    matched_at: float
+
+
+def search_window(ticket: Ticket, now: float) -> int:
+    waited = max(0.0, now - ticket.enqueued_at)
+    return min(MATCH_WINDOW_MAX, MATCH_WINDOW_BASE + int(waited * MATCH_WINDOW_GROWTH))
+
+
+def acceptable(a: Ticket, b: Ticket, now: float) -> bool:
+    return abs(a.rating - b.rating) <= max(search_window(a, now), search_window(b, now))
+
+
+class RatingQueue:
+    '''Waiting tickets for one (time_control, bet_amount), ordered by rating then arrival.'''
+
+    def __init__(self) -> None:
+        self.tickets = SortedList()
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    def add(self, ticket: Ticket) -> None:
+        self.tickets.add(ticket)
+
+    def remove(self, ticket: Ticket) -> None:
+        self.tickets.discard(ticket)
+
+    def nearest(self, ticket: Ticket, now: float) -> Optional[Ticket]:
+        tickets = self.tickets
+        index = tickets.bisect_left(ticket)
+        best = None
+        for neighbour in (index - 1, index):
+            if 0 <= neighbour < len(tickets):
+                candidate = tickets[neighbour]
+                if not acceptable(ticket, candidate, now):
+                    continue
+                if best is None or abs(candidate.rating - ticket.rating) < abs(best.rating - ticket.rating):
+                    best = candidate
+        return best
+
+    def sweep(self, now: float) -> List[Tuple[Ticket, Ticket]]:
+        ordered = list(self.tickets)
+        pairs = []
+        i = 0
+        while i < len(ordered) - 1:
+            if acceptable(ordered[i], ordered[i + 1], now):
+                pairs.append((ordered[i], ordered[i + 1]))
+                i += 2
+            else:
+                i += 1
+        for a, b in pairs:
+            self.tickets.remove(a)
+            self.tickets.remove(b)
+        return pairs
+
+
+class MatchmakingService:
+    def __init__(self) -> None:
+        self.queues: Dict[QueueKey, RatingQueue] = {}
+        self.waiting: Dict[int, Ticket] = {}
+        # Paired players whose games row is still being inserted.
+        self.creating: Dict[int, Ticket] = {}
+        self.results = TTLCache(maxsize=10000)
+        self.swept_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def _queue(self, key: QueueKey) -> RatingQueue:
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = RatingQueue()
+        return queue
+
+    def _matched(self, a: Ticket, b: Ticket, now: float) -> Match:
+        player1, player2 = (a, b) if a.enqueued_at <= b.enqueued_at else (b, a)
+        self.creating[a.player_id] = a
+        self.creating[b.player_id] = b
+        return Match(player1, player2, now)
+
+    def join(self, player_id: int, rating: int, key: QueueKey, now: Optional[float] = None) -> Optional[Match]:
+        '''Queues the player or pairs them; a returned Match must go to insert_games, then publish or requeue.'''
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.results.pop(str(player_id))
+            previous = self.waiting.pop(player_id, None)
+            if previous is not None:
+                self._queue(previous.key).remove(previous)
+
+            ticket = Ticket(rating, now, player_id, key)
+            queue = self._queue(key)
+            opponent = queue.nearest(ticket, now)
+            if opponent is None:
+                queue.add(ticket)
+                self.waiting[player_id] = ticket
+                return None
+
+            queue.remove(opponent)
+            del self.waiting[opponent.player_id]
+            return self._matched(opponent, ticket, now)
+
+    def leave(self, player_id: int) -> bool:
+        with self._lock:
+            ticket = self.waiting.pop(player_id, None)
+            if ticket is None:
+                return False
+            self._queue(ticket.key).remove(ticket)
+            return True
+
+    def sweep(self, now: Optional[float] = None) -> List[Match]:
+        now = time.monotonic() if now is None else now
+        matches: List[Match] = []
+        with self._lock:
+            if now - self.swept_at < MATCH_SWEEP_INTERVAL:
+                return matches
+            self.swept_at = now
+            for queue in self.queues.values():
+                if len(queue) < 2:
+                    continue
+                for a, b in queue.sweep(now):
+                    del self.waiting[a.player_id]
+                    del self.waiting[b.player_id]
+                    matches.append(self._matched(a, b, now))
+        return matches
+
+    def requeue(self, matches: Sequence[Match]) -> None:
+        '''Puts the tickets of matches whose games row was not written back into their queues.'''
+        with self._lock:
+            for match in matches:
+                for ticket in (match.player1, match.player2):
+                    self.creating.pop(ticket.player_id, None)
+                    self._queue(ticket.key).add(ticket)
+                    self.waiting[ticket.player_id] = ticket
+
+    def publish(self, match: Match, game_id: int) -> None:
+        time_control, bet_amount = match.player1.key
+        with self._lock:
+            for ticket, opponent in ((match.player1, match.player2), (match.player2, match.player1)):
+                self.creating.pop(ticket.player_id, None)
+                self.results.put(str(ticket.player_id), {
+                    'gameId': game_id,
+                    'opponentId': opponent.player_id,
+                    'opponentRating': opponent.rating,
+                    'color': 'white' if ticket is match.player1 else 'black',
+                    'timeControl': time_control,
+                    'betAmount': bet_amount
+                }, MATCH_RESULT_TTL)
+
+    def status(self, player_id: int, now: Optional[float] = None) -> Dict[str, Any]:
+        found, result = self.results.get(str(player_id))
+        if found:
+            return {'status': 'matched', **result}
+
+        ticket = self.waiting.get(player_id) or self.creating.get(player_id)
+        if ticket is None:
+            return {'status': 'idle'}
+
+        now = time.monotonic() if now is None else now
+        return {
+            'status': 'waiting',
+            'timeControl': ticket.key[0],
+            'betAmount': ticket.key[1],
+            'window': search_window(ticket, now),
+            'waited': round(now - ticket.enqueued_at, 1)
+        }
+
+
+def insert_games(
+    conn: Any, matches: Sequence[Match], openings: Sequence[Opening], batch_size: int = MATCH_BATCH_SIZE
+) -> List[int]:
+    '''Writes matches as active games with their opening relay state, batch_size rows per INSERT, and commits; returns game ids in order.'''
+    game_ids: List[int] = []
+    try:
+        with conn.cursor() as cur:
+            for start in range(0, len(matches), batch_size):
+                chunk = list(zip(matches[start:start + batch_size], openings[start:start + batch_size]))
+                cur.execute(
+                    f"""INSERT INTO games (player1_id, player2_id, bet_amount, time_control, status, started_at,
+                                           move_count, game_data, move_log)
+                        VALUES {', '.join(["(%s, %s, %s, %s, 'active', CURRENT_TIMESTAMP, 0, %s, %s::bytea)"] * len(chunk))}
+                        RETURNING id, player1_id""",
+                    tuple(
+                        value
+                        for match, (game_data, move_log) in chunk
+                        for value in (
+                            match.player1.player_id, match.player2.player_id, match.player1.key[1], match.player1.key[0],
+                            game_data, move_log,
+                        )
+                    )
+                )
+                created = dict((player1_id, game_id) for game_id, player1_id in cur.fetchall())
+                game_ids.extend(created[match.player1.player_id] for match, _ in chunk)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return game_ids
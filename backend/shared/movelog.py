@@ -0,0 +1,154 @@
+'''
+Versioned binary move log for games.move_log (bytea).
+
+Layout (version 1):
+    header  b'DC' + version byte
+    turn    dice byte (three faces as a base-6 number, 0..215) + move count byte
+    move    uint16 little-endian: from (6 bits) | to << 6 | piece type << 12 | capture << 15
+
+Squares are 0..63 with row 0 being rank 8, as in the client board. A turn
+header tells how many two-byte moves follow, so iter_moves can jump to move
+N by walking turn headers without decoding the moves it skips.
+'''
+
+from typing import Iterator, List, NamedTuple, Sequence, Tuple
+
+from shared.engine import PIECE_TYPES
+
+
+MAGIC = b'DC'
+VERSION = 1
+HEADER_SIZE = 3
+
+
+class MoveLogError(ValueError):
+    pass
+
+
+class MoveRecord(NamedTuple):
+    ply: int
+    turn: int
+    dice: Tuple[str, ...]
+    frm: int
+    to: int
+    piece_type: str
+    capture: bool
+
+
+def encode_dice(dice: Sequence[str]) -> int:
+    if len(dice) != 3:
+        raise MoveLogError('A turn needs exactly three dice')
+    code = 0
+    for face in dice:
+        code = code * 6 + PIECE_TYPES.index(face)
+    return code
+
+
+def decode_dice(code: int) -> Tuple[str, str, str]:
+    return PIECE_TYPES[code // 36], PIECE_TYPES[code // 6 % 6], PIECE_TYPES[code % 6]
+
+
+def encode_move(frm: int, to: int, piece_type: str, capture: bool = False) -> int:
+    return frm | to << 6 | (PIECE_TYPES.index(piece_type) + 1) << 12 | int(capture) << 15
+
+
+class MoveLogWriter:
+    def __init__(self) -> None:
+        self._buffer = bytearray(MAGIC)
+        self._buffer.append(VERSION)
+        self._count_at = -1
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'MoveLogWriter':
+        '''Resumes writing after the last turn of an existing log.'''
+        check_header(data)
+        writer = cls()
+        writer._buffer = bytearray(data)
+        offset = HEADER_SIZE
+        while offset + 2 <= len(data):
+            writer._count_at = offset + 1
+            offset += 2 + 2 * data[offset + 1]
+        if offset != len(data):
+            raise MoveLogError('Truncated move log')
+        return writer
+
+    def begin_turn(self, dice: Sequence[str]) -> None:
+        self._buffer.append(encode_dice(dice))
+        self._count_at = len(self._buffer)
+        self._buffer.append(0)
+
+    def add_move(self, frm: int, to: int, piece_type: str, capture: bool = False) -> None:
+        if self._count_at < 0:
+            raise MoveLogError('begin_turn must be called before add_move')
+        if self._buffer[self._count_at] == 3:
+            raise MoveLogError('A turn holds at most three moves')
+        self._buffer[self._count_at] += 1
+        self._buffer += encode_move(frm, to, piece_type, capture).to_bytes(2, 'little')
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buffer)
+
+
+def check_header(data: bytes) -> None:
+    if data[:2] != MAGIC:
+        raise MoveLogError('Not a move log')
+    if len(data) < HEADER_SIZE or data[2] != VERSION:
+        raise MoveLogError(f'Unsupported move log version {data[2] if len(data) > 2 else None}')
+
+
+def iter_moves(data: bytes, start: int = 0) -> Iterator[MoveRecord]:
+    '''Lazily yields moves from ply start onwards.'''
+    check_header(data)
+    size = len(data)
+    offset = HEADER_SIZE
+    ply = 0
+    turn = 0
+
+    while offset + 2 <= size:
+        count = data[offset + 1]
+        if ply + count <= start:
+            offset += 2 + 2 * count
+            ply += count
+            turn += 1
+            continue
+
+        dice = decode_dice(data[offset])
+        offset += 2
+        end = offset + 2 * count
+        if end > size:
+            raise MoveLogError('Truncated move log')
+        while offset < end:
+            if ply >= start:
+                packed = data[offset] | data[offset + 1] << 8
+                yield MoveRecord(
+                    ply, turn, dice,
+                    packed & 63, packed >> 6 & 63,
+                    PIECE_TYPES[(packed >> 12 & 7) - 1], bool(packed >> 15),
+                )
+            offset += 2
+            ply += 1
+        turn += 1
+
+
+def move_count(data: bytes) -> int:
+    check_header(data)
+    total = 0
+    offset = HEADER_SIZE
+    while offset + 2 <= len(data):
+        count = data[offset + 1]
+        total += count
+        offset += 2 + 2 * count
+    return total
+
+
+def encode_game(turns: Sequence[Tuple[Sequence[str], Sequence[Tuple[int, int, str, bool]]]]) -> bytes:
+    writer = MoveLogWriter()
+    for dice, moves in turns:
+        writer.begin_turn(dice)
+        for frm, to, piece_type, capture in moves:
+            writer.add_move(frm, to, piece_type, capture)
+    return writer.getvalue()
+
+
+def decode_game(data: bytes) -> List[MoveRecord]:
+    return list(iter_moves(data))
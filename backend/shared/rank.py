@@ -0,0 +1,56 @@
+'''
+Player rank lookups backed by the rating_histogram table.
+
+The histogram holds a row per distinct rating and shard (the trigger spreads
+writes over 16 shards so concurrent rating changes do not queue on one row),
+so it stays a few tens of thousands of rows long no matter how many players
+there are. The shards are summed on load into a sorted array with suffix
+sums, cached in-process for RANK_CACHE_TTL seconds; rank_of is then a binary
+search. Ranks may lag by at most that window.
+'''
+
+import os
+from bisect import bisect_right
+from typing import Any, Iterable, List, Optional, Tuple
+
+from shared.lazy import Refreshing
+
+
+RANK_CACHE_TTL = float(os.environ.get('RANK_CACHE_TTL', '30'))
+
+
+class RankIndex:
+    '''Immutable snapshot answering "how many players rate above r".'''
+
+    def __init__(self, rows: Iterable[Tuple[int, int]]):
+        self.ratings: List[int] = []
+        counts: List[int] = []
+        for rating, players in sorted(rows):
+            if players > 0:
+                self.ratings.append(rating)
+                counts.append(players)
+
+        self.above: List[int] = [0] * (len(counts) + 1)
+        for i in range(len(counts) - 1, -1, -1):
+            self.above[i] = self.above[i + 1] + counts[i]
+
+    @property
+    def total(self) -> int:
+        return self.above[0]
+
+    def rank_of(self, rating: Optional[int]) -> int:
+        if rating is None:
+            return 1
+        return self.above[bisect_right(self.ratings, rating)] + 1
+
+
+def load_index(conn: Any) -> RankIndex:
+    with conn.cursor() as cur:
+        cur.execute(
+            """SELECT rating, SUM(players) FROM t_p26016213_dice_chess_website.rating_histogram
+               GROUP BY rating HAVING SUM(players) > 0"""
+        )
+        return RankIndex(cur.fetchall())
+
+
+rank_index = Refreshing(load_index, RANK_CACHE_TTL)
@@ -0,0 +1,22 @@
+'''
+Elo rating arithmetic shared by the game function and offline recalculation.
+
+Pure Python on purpose: the game function ships without NumPy, which only
+shared.rating_replay needs (backend/requirements.txt).
+'''
+
+from typing import Tuple
+
+
+ELO_K_FACTOR = 32
+BOT_RATINGS = {'easy': 800, 'medium': 1200, 'hard': 1600}
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def elo_changes(rating1: float, rating2: float, score1: float, k: float = ELO_K_FACTOR) -> Tuple[int, int]:
+    '''Rating deltas for both sides, where score1 is 1, 0.5 or 0 for player 1.'''
+    change = round(k * (score1 - expected_score(rating1, rating2)))
+    return change, -change
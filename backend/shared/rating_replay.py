@@ -0,0 +1,190 @@
+'''
+Offline Elo recalculation over the whole finished-games history, vectorised with NumPy.
+
+Finished games are streamed oldest first through a server-side (named)
+cursor, REPLAY_CHUNK_ROWS at a time, and grouped into rating periods of
+REPLAY_SLICE_SECONDS by end time. Every game in a period is scored against
+the ratings at the start of the period, and the rounded deltas are summed
+per player with one np.bincount, so one period costs a handful of array
+operations however many games it holds. With periods short enough that
+nobody finishes two games in one, this is the same as replaying the games
+one by one through rating.elo_changes; longer periods give the usual
+rating-period behaviour.
+
+Scores come from games.result, so any K can be replayed; finished games
+whose result V0010 could not recover are left out. The stored
+per-game changes are left as they are, and only players.rating is written
+back: COPY into a temporary table, then one UPDATE ... FROM. Install
+backend/requirements.txt and start from backend/ with:
+
+    python -m shared.rating_replay [--k 24] [--slice 3600] [--apply]
+'''
+
+import argparse
+import io
+import os
+import resource
+import time
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from shared.rating import BOT_RATINGS, ELO_K_FACTOR
+
+REPLAY_CHUNK_ROWS = int(os.environ.get('REPLAY_CHUNK_ROWS', '50000'))
+REPLAY_SLICE_SECONDS = int(os.environ.get('REPLAY_SLICE_SECONDS', '3600'))
+INITIAL_RATING = 1000
+
+# ended, player1, player2 (0 = bot), player1's score in half points (2 win, 1 draw, 0 loss), bot rating
+COLUMNS = ('ended', 'player1', 'player2', 'points', 'bot_rating')
+RESULT_POINTS = {'player1': 2, 'draw': 1, 'player2': 0}
+
+GAMES_QUERY = f"""
+    SELECT EXTRACT(EPOCH FROM COALESCE(ended_at, started_at))::bigint,
+           player1_id, COALESCE(player2_id, 0),
+           CASE result {' '.join(f"WHEN '{name}' THEN {points}" for name, points in RESULT_POINTS.items())} END,
+           CASE difficulty {' '.join(f"WHEN '{name}' THEN {rating}" for name, rating in BOT_RATINGS.items())}
+                ELSE {INITIAL_RATING} END
+    FROM games
+    WHERE status = 'finished' AND player1_id IS NOT NULL AND result IS NOT NULL
+    ORDER BY COALESCE(ended_at, started_at), id
+"""
+
+Chunk = Dict[str, np.ndarray]
+
+
+def chunk_from_rows(rows: Sequence[Tuple[int, ...]]) -> Chunk:
+    table = np.fromiter(chain.from_iterable(rows), np.int64, len(rows) * len(COLUMNS)).reshape(-1, len(COLUMNS))
+    return {name: table[:, i] for i, name in enumerate(COLUMNS)}
+
+
+def expected(rating: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+def _scatter_add(target: np.ndarray, index: np.ndarray, values: np.ndarray) -> None:
+    '''target[index] += values with repeated indices summed; much faster than np.add.at.'''
+    unique, inverse = np.unique(index, return_inverse=True)
+    target[unique] += np.bincount(inverse, weights=values, minlength=len(unique)).astype(target.dtype)
+
+
+class RatingReplay:
+    def __init__(self, max_player_id: int, k: float = ELO_K_FACTOR, slice_seconds: int = REPLAY_SLICE_SECONDS):
+        self.k = k
+        self.slice_seconds = slice_seconds
+        self.ratings = np.full(max_player_id + 1, INITIAL_RATING, dtype=np.int64)
+        self.played = np.zeros(max_player_id + 1, dtype=bool)
+        self.games = 0
+        self.slices = 0
+        self._tail: Optional[Chunk] = None
+
+    def _apply_slice(self, chunk: Chunk) -> None:
+        player1, player2 = chunk['player1'], chunk['player2']
+        score = chunk['points'] / 2
+        bot = player2 == 0
+        opponent = np.where(bot, chunk['bot_rating'], self.ratings[player2])
+        delta = np.rint(self.k * (score - expected(self.ratings[player1], opponent))).astype(np.int64)
+
+        pvp = ~bot
+        _scatter_add(self.ratings, np.concatenate([player1, player2[pvp]]), np.concatenate([delta, -delta[pvp]]))
+        self.played[player1] = True
+        self.played[player2[pvp]] = True
+        self.games += len(player1)
+        self.slices += 1
+
+    def feed(self, chunk: Chunk) -> None:
+        '''Replays every complete slice; the last one waits for the next chunk or finish().'''
+        if self._tail is not None:
+            chunk = {name: np.concatenate([self._tail[name], chunk[name]]) for name in COLUMNS}
+            self._tail = None
+        if not len(chunk['ended']):
+            return
+
+        period = chunk['ended'] // self.slice_seconds
+        bounds = np.flatnonzero(period[1:] != period[:-1]) + 1
+        starts = np.r_[0, bounds]
+        ends = np.r_[bounds, len(period)]
+        for start, end in zip(starts[:-1], ends[:-1]):
+            self._apply_slice({name: values[start:end] for name, values in chunk.items()})
+        self._tail = {name: values[starts[-1]:] for name, values in chunk.items()}
+
+    def finish(self) -> None:
+        if self._tail is not None:
+            self._apply_slice(self._tail)
+            self._tail = None
+
+    def results(self) -> List[Tuple[int, int]]:
+        player_ids = np.flatnonzero(self.played)
+        return list(zip(player_ids.tolist(), self.ratings[player_ids].tolist()))
+
+
+def stream_games(conn: Any, chunk_rows: int = REPLAY_CHUNK_ROWS) -> Iterator[Chunk]:
+    with conn.cursor(name='rating_replay') as cur:
+        cur.execute(GAMES_QUERY)
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield chunk_from_rows(rows)
+
+
+def write_ratings(conn: Any, ratings: Sequence[Tuple[int, int]]) -> int:
+    buffer = io.StringIO(''.join(f'{player_id}\t{rating}\n' for player_id, rating in ratings))
+    with conn.cursor() as cur:
+        cur.execute("CREATE TEMP TABLE replayed_ratings (player_id INTEGER PRIMARY KEY, rating INTEGER) ON COMMIT DROP")
+        cur.copy_from(buffer, 'replayed_ratings', columns=('player_id', 'rating'))
+        cur.execute(
+            """UPDATE players p SET rating = r.rating
+               FROM replayed_ratings r
+               WHERE p.id = r.player_id AND p.rating IS DISTINCT FROM r.rating"""
+        )
+        updated = cur.rowcount
+    conn.commit()
+    return updated
+
+
+def replay(conn: Any, k: float, slice_seconds: int, chunk_rows: int) -> RatingReplay:
+    with conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM players")
+        max_player_id = cur.fetchone()[0]
+    engine = RatingReplay(max_player_id, k, slice_seconds)
+    for chunk in stream_games(conn, chunk_rows):
+        engine.feed(chunk)
+    engine.finish()
+    conn.commit()
+    return engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Recalculate every rating from the finished-games history')
+    parser.add_argument('--k', type=float, default=ELO_K_FACTOR)
+    parser.add_argument('--slice', type=int, default=REPLAY_SLICE_SECONDS, help='rating period in seconds')
+    parser.add_argument('--chunk', type=int, default=REPLAY_CHUNK_ROWS)
+    parser.add_argument('--apply', action='store_true', help='write the ratings back to players')
+    args = parser.parse_args()
+
+    import psycopg2
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        started = time.perf_counter()
+        engine = replay(conn, args.k, args.slice, args.chunk)
+        elapsed = time.perf_counter() - started
+
+        ratings = engine.results()
+        print(f'replayed {engine.games:,} games in {engine.slices:,} periods of {args.slice}s with K={args.k:g}')
+        print(f'{elapsed:.2f}s, {engine.games / max(elapsed, 1e-9):,.0f} rows/s')
+        print(f'peak memory (max RSS) {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB')
+        print(f'{len(ratings):,} players rated')
+
+        if args.apply:
+            started = time.perf_counter()
+            updated = write_ratings(conn, ratings)
+            print(f'updated {updated:,} players in {time.perf_counter() - started:.2f}s')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
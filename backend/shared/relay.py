@@ -0,0 +1,562 @@
+'''
+Business: Сервер партий в реальном времени: кости на сервере, проверка ходов, long-poll и подбор соперников
+Args: --host, --port; DATABASE_URL в окружении, заголовок X-Auth-Token в каждом запросе
+Returns: GET /games/<id>?after=<version>, POST /games/<id>/moves, POST /matchmaking/join и /leave, GET /matchmaking
+
+Run from backend/: python -m shared.relay --port 8081
+Rooms live in memory and are written to games every RELAY_FLUSH_INTERVAL
+seconds; the game function's finish settles a game from the state saved here.
+'''
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from shared.dice import DICE_PER_TURN, movable_types
+from shared.engine import BLACK, KING, PIECE_TYPES, TYPE_MASK, WHITE, Board, make_move, parse_square, square_name
+from shared.matchmaking import MATCH_SWEEP_INTERVAL, Match, MatchmakingService, Opening
+from shared.movelog import MoveLogWriter
+from shared.sessions import TTLCache
+
+
+RELAY_POLL_TIMEOUT = float(os.environ.get('RELAY_POLL_TIMEOUT', '25'))
+RELAY_FLUSH_INTERVAL = float(os.environ.get('RELAY_FLUSH_INTERVAL', '2'))
+RELAY_IDLE_TTL = float(os.environ.get('RELAY_IDLE_TTL', '600'))
+RELAY_AUTH_TTL = float(os.environ.get('RELAY_AUTH_TTL', '60'))
+RELAY_MAX_BODY = 4096
+MAX_PASSES = 64
+
+COLOR_NAMES = {WHITE: 'white', BLACK: 'black'}
+SQUARE_NAME = re.compile(r'^[a-h][1-8]$')
+GAME_PATH = re.compile(r'^/games/(\d+)(/moves)?$')
+MATCH_PATH = re.compile(r'^/matchmaking(?:/(join|leave))?$')
+
+_dice_rng = random.SystemRandom()
+
+# (game_id, move_count, game_data, move_log)
+SavedGame = Tuple[int, int, str, bytes]
+
+
+class RelayError(ValueError):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def log_square(square: int) -> int:
+    return (square >> 4) * 8 + (square & 7)
+
+
+class GameRoom:
+    def __init__(self, game_id: int, white_id: int, black_id: int, rng: random.Random = _dice_rng):
+        self.game_id = game_id
+        self.players = {WHITE: white_id, BLACK: black_id}
+        self.rng = rng
+        self.board = Board.initial()
+        self.color = WHITE
+        self.rolled: Tuple[str, ...] = ()
+        self.dice: List[int] = []
+        self.log = MoveLogWriter()
+        self.move_count = 0
+        self.status = 'active'
+        self.winner_id: Optional[int] = None
+        self.version = 0
+        self.saved_version = 0
+        self.touched = time.monotonic()
+        self._changed = asyncio.Event()
+        self._snapshot: Tuple[int, bytes] = (-1, b'')
+
+    @classmethod
+    def restore(
+        cls, game_id: int, white_id: int, black_id: int, game_data: Optional[str], move_log: Optional[bytes]
+    ) -> Optional['GameRoom']:
+        '''The room as last saved, from the opening state onwards; None for a game the relay never opened.'''
+        snapshot = json.loads(game_data) if game_data else None
+        if not isinstance(snapshot, dict) or 'relay' not in snapshot or move_log is None:
+            return None
+
+        room = cls(game_id, white_id, black_id)
+        saved = snapshot['relay']
+        room.board = Board.from_rows(saved['board'])
+        room.color = BLACK if saved['turn'] == 'black' else WHITE
+        room.rolled = tuple(saved['rolled'])
+        room.dice = [PIECE_TYPES.index(face) + 1 for face in saved['dice']]
+        room.log = MoveLogWriter.from_bytes(bytes(move_log))
+        room.move_count = saved['moveCount']
+        room.status = saved['status']
+        room.winner_id = saved['winnerId']
+        return room
+
+    def player_color(self, player_id: int) -> Optional[int]:
+        for color, owner in self.players.items():
+            if owner == player_id:
+                return color
+        return None
+
+    def legal_moves(self) -> List[int]:
+        allowed = 0
+        for piece_type in self.dice:
+            allowed |= 1 << piece_type
+        return self.board.moves(self.color, allowed) if allowed else []
+
+    def _roll(self) -> None:
+        self.rolled = tuple(self.rng.choice(PIECE_TYPES) for _ in range(DICE_PER_TURN))
+        self.dice = [PIECE_TYPES.index(face) + 1 for face in self.rolled]
+        self.log.begin_turn(self.rolled)
+
+    def start_turn(self) -> None:
+        '''Rolls for the side to move, passing the turn while a roll allows no move.'''
+        if not movable_types(self.board, WHITE) and not movable_types(self.board, BLACK):
+            self._finish(None)
+            return
+        for _ in range(MAX_PASSES):
+            self._roll()
+            if self.legal_moves():
+                return
+            self.color ^= BLACK
+        self._finish(None)
+
+    def _finish(self, winner_id: Optional[int]) -> None:
+        self.status = 'finished'
+        self.winner_id = winner_id
+        self.dice = []
+
+    def move(self, player_id: int, frm_name: str, to_name: str) -> None:
+        if self.status != 'active':
+            raise RelayError('Игра завершена', 409)
+        if self.players[self.color] != player_id:
+            raise RelayError('Сейчас не ваш ход', 409)
+        if not SQUARE_NAME.match(frm_name or '') or not SQUARE_NAME.match(to_name or ''):
+            raise RelayError('Некорректная клетка')
+
+        frm, to = parse_square(frm_name), parse_square(to_name)
+        piece = self.board.squares[frm]
+        piece_type = piece & TYPE_MASK
+        move = make_move(frm, to)
+        if (
+            not piece
+            or piece & BLACK != self.color
+            or piece_type not in self.dice
+            or move not in self.board.moves(self.color, 1 << piece_type)
+        ):
+            raise RelayError('Недопустимый ход')
+
+        captured = self.board.make(move)
+        self.dice.remove(piece_type)
+        self.log.add_move(log_square(frm), log_square(to), PIECE_TYPES[piece_type - 1], bool(captured))
+        self.move_count += 1
+
+        if captured & TYPE_MASK == KING:
+            self._finish(player_id)
+        elif not self.dice or not self.legal_moves():
+            self.color ^= BLACK
+            self.start_turn()
+        self.changed()
+
+    def changed(self) -> None:
+        self.version += 1
+        self.touched = time.monotonic()
+        event, self._changed = self._changed, asyncio.Event()
+        event.set()
+
+    async def wait(self, after: int, timeout: float) -> None:
+        if self.version > after:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def position(self) -> Dict[str, Any]:
+        return {
+            'board': self.board.to_rows(),
+            'turn': COLOR_NAMES[self.color],
+            'rolled': list(self.rolled),
+            'dice': [PIECE_TYPES[piece_type - 1] for piece_type in self.dice],
+            'moveCount': self.move_count,
+            'status': self.status,
+            'winnerId': self.winner_id,
+        }
+
+    def snapshot(self) -> bytes:
+        '''Serialised state for the current version, shared by both players' polls.'''
+        version, body = self._snapshot
+        if version != self.version:
+            state = self.position()
+            state.update(
+                gameId=self.game_id,
+                version=self.version,
+                white=self.players[WHITE],
+                black=self.players[BLACK],
+                moves=[[square_name(move & 127), square_name(move >> 7)] for move in self.legal_moves()],
+            )
+            body = json.dumps(state, ensure_ascii=False).encode()
+            self._snapshot = (self.version, body)
+        return body
+
+    def saved(self) -> SavedGame:
+        return self.game_id, self.move_count, json.dumps({'relay': self.position()}), self.log.getvalue()
+
+    def opening(self) -> Opening:
+        _, _, game_data, move_log = self.saved()
+        return game_data, move_log
+
+
+class PostgresStore:
+    '''Blocking games access through the shared pool; Relay calls it from an executor.'''
+
+    def load(self, game_id: int) -> Optional[Tuple[Any, ...]]:
+        from shared.db import pool
+
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """SELECT player1_id, player2_id, game_data, move_log FROM games
+                       WHERE id = %s AND status = 'active' AND player2_id IS NOT NULL""",
+                    (game_id,)
+                )
+                return cur.fetchone()
+
+    def save(self, rows: Sequence[SavedGame]) -> None:
+        from shared.db import pool
+
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""UPDATE games g
+                        SET move_count = v.move_count, game_data = v.game_data, move_log = v.move_log
+                        FROM (VALUES {', '.join(['(%s, %s, %s, %s::bytea)'] * len(rows))})
+                             AS v(id, move_count, game_data, move_log)
+                        WHERE g.id = v.id AND g.status = 'active'""",
+                    tuple(value for row in rows for value in row)
+                )
+            conn.commit()
+
+    def player(self, player_id: int) -> Optional[Tuple[int, int]]:
+        from shared.db import pool
+
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT rating, tokens FROM players WHERE id = %s", (player_id,))
+                return cur.fetchone()
+
+    def create_games(self, matches: Sequence[Match], openings: Sequence[Opening]) -> List[int]:
+        from shared.db import pool
+        from shared.matchmaking import insert_games
+
+        with pool.connection() as conn:
+            return insert_games(conn, matches, openings)
+
+    def authenticate(self, token: str) -> Optional[int]:
+        from shared.db import pool
+        from shared.sessions import sessions
+
+        with pool.connection() as conn:
+            return sessions.resolve(conn, token)
+
+
+class Relay:
+    def __init__(self, store: Any, flush_interval: float = RELAY_FLUSH_INTERVAL):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.rooms: Dict[int, GameRoom] = {}
+        self.tokens = TTLCache(maxsize=10000)
+        self.matchmaking = MatchmakingService()
+        self.flushes = 0
+        self.flushed_rows = 0
+        self._loading: Dict[int, 'asyncio.Future[Optional[GameRoom]]'] = {}
+        self._flush_now = asyncio.Event()
+        self._matched = asyncio.Event()
+
+    async def _blocking(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def authenticate(self, token: Optional[str]) -> Optional[int]:
+        if not token:
+            return None
+        found, player_id = self.tokens.get(token)
+        if not found:
+            player_id = await self._blocking(self.store.authenticate, token)
+            self.tokens.put(token, player_id, RELAY_AUTH_TTL if player_id else 5)
+        return player_id
+
+    def open(self, white_id: int, black_id: int) -> GameRoom:
+        '''A new room with its first roll; create_games stores it with the games row and then registers it.'''
+        room = GameRoom(0, white_id, black_id)
+        room.start_turn()
+        return room
+
+    async def room(self, game_id: int) -> Optional[GameRoom]:
+        room = self.rooms.get(game_id)
+        if room is not None:
+            return room
+
+        loading = self._loading.get(game_id)
+        if loading is None:
+            loading = self._loading[game_id] = asyncio.ensure_future(self._load(game_id))
+        try:
+            return await asyncio.shield(loading)
+        finally:
+            self._loading.pop(game_id, None)
+
+    async def _load(self, game_id: int) -> Optional[GameRoom]:
+        row = await self._blocking(self.store.load, game_id)
+        if row is None:
+            return None
+        white_id, black_id, game_data, move_log = row
+        room = GameRoom.restore(game_id, white_id, black_id, game_data, move_log)
+        if room is not None:
+            self.rooms[game_id] = room
+        return room
+
+    async def join(self, player_id: int, time_control: str, bet_amount: int) -> None:
+        if player_id in self.matchmaking.creating:
+            return
+        player = await self._blocking(self.store.player, player_id)
+        if not player:
+            raise RelayError('Игрок не найден', 404)
+        rating, tokens = player
+        if (tokens or 0) < bet_amount:
+            raise RelayError('Недостаточно жетонов для ставки')
+
+        match = self.matchmaking.join(player_id, rating or 1000, (time_control, bet_amount))
+        if match is not None:
+            await self._create_logged([match])
+
+    async def create_games(self, matches: List[Match]) -> None:
+        rooms = [self.open(match.player1.player_id, match.player2.player_id) for match in matches]
+        try:
+            game_ids = await self._blocking(self.store.create_games, matches, [room.opening() for room in rooms])
+        except Exception:
+            self.matchmaking.requeue(matches)
+            raise
+        for match, room, game_id in zip(matches, rooms, game_ids):
+            room.game_id = game_id
+            self.rooms[game_id] = room
+            self.matchmaking.publish(match, game_id)
+        event, self._matched = self._matched, asyncio.Event()
+        event.set()
+
+    async def _create_logged(self, matches: List[Match]) -> None:
+        '''create_games for callers that carry on: failed pairs are back in the queue for the next sweep.'''
+        try:
+            await self.create_games(matches)
+        except Exception as e:
+            print(json.dumps({'relay': 'match_failed', 'error': f'{type(e).__name__}: {e}'}), flush=True)
+
+    async def match_status(self, player_id: int, timeout: float) -> Dict[str, Any]:
+        '''Search status, held up to timeout while the player is still waiting for an opponent.'''
+        deadline = time.monotonic() + timeout
+        status = self.matchmaking.status(player_id)
+        while status['status'] == 'waiting':
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._matched.wait(), min(remaining, MATCH_SWEEP_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+            status = self.matchmaking.status(player_id)
+        return status
+
+    async def match_loop(self) -> None:
+        while True:
+            await asyncio.sleep(MATCH_SWEEP_INTERVAL)
+            matches = self.matchmaking.sweep()
+            if matches:
+                await self._create_logged(matches)
+
+    def move(self, room: GameRoom, player_id: int, frm: str, to: str) -> None:
+        room.move(player_id, frm, to)
+        if room.status == 'finished':
+            self._flush_now.set()
+
+    async def flush(self) -> int:
+        dirty = [room for room in self.rooms.values() if room.version != room.saved_version]
+        if not dirty:
+            return 0
+        versions = [(room, room.version) for room in dirty]
+        await self._blocking(self.store.save, [room.saved() for room in dirty])
+        for room, version in versions:
+            room.saved_version = version
+        self.flushes += 1
+        self.flushed_rows += len(dirty)
+        return len(dirty)
+
+    def evict(self) -> None:
+        deadline = time.monotonic() - RELAY_IDLE_TTL
+        for game_id, room in list(self.rooms.items()):
+            if room.version == room.saved_version and room.touched < deadline:
+                del self.rooms[game_id]
+
+    async def flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(json.dumps({'relay': 'flush_failed', 'error': f'{type(e).__name__}: {e}'}), flush=True)
+            self.evict()
+
+
+class RelayServer:
+    '''Keep-alive HTTP/1.1 front end for a Relay.'''
+
+    CORS = (
+        b'Access-Control-Allow-Origin: *\r\n'
+        b'Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n'
+        b'Access-Control-Allow-Headers: Content-Type, X-Auth-Token\r\n'
+    )
+
+    def __init__(self, relay: Relay, poll_timeout: float = RELAY_POLL_TIMEOUT):
+        self.relay = relay
+        self.poll_timeout = poll_timeout
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                if length > RELAY_MAX_BODY:
+                    self._write(writer, 413, json.dumps({'error': 'Слишком большой запрос'}).encode(), close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self.route(method, target, headers, body)
+                close = headers.get('connection', '').lower() == 'close'
+                self._write(writer, status, payload, close)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _write(self, writer: asyncio.StreamWriter, status: int, payload: bytes, close: bool = False) -> None:
+        head = (
+            f'HTTP/1.1 {status} {"OK" if status < 400 else "Error"}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+            f'Connection: {"close" if close else "keep-alive"}\r\n'
+        ).encode()
+        writer.write(head + self.CORS + b'\r\n' + payload)
+
+    @staticmethod
+    def _error(status: int, message: str) -> Tuple[int, bytes]:
+        return status, json.dumps({'error': message}, ensure_ascii=False).encode()
+
+    async def route(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes]:
+        if method == 'OPTIONS':
+            return 200, b''
+
+        url = urlsplit(target)
+        matched = GAME_PATH.match(url.path)
+        queue = MATCH_PATH.match(url.path)
+        if queue:
+            if (method, bool(queue.group(1))) not in (('GET', False), ('POST', True)):
+                return self._error(404, 'Не найдено')
+        elif not matched or (method, bool(matched.group(2))) not in (('GET', False), ('POST', True)):
+            return self._error(404, 'Не найдено')
+
+        player_id = await self.relay.authenticate(headers.get('x-auth-token'))
+        if not player_id:
+            return self._error(401, 'Неверный или истекший токен')
+
+        if queue:
+            return await self.matchmaking(queue.group(1), player_id, body)
+
+        room = await self.relay.room(int(matched.group(1)))
+        if room is None:
+            return self._error(404, 'Игра не найдена')
+        if room.player_color(player_id) is None:
+            return self._error(403, 'Вы не участвуете в этой игре')
+
+        if method == 'GET':
+            after = parse_qs(url.query).get('after', ['-1'])[0]
+            await room.wait(int(after) if after.lstrip('-').isdigit() else -1, self.poll_timeout)
+            return 200, room.snapshot()
+
+        try:
+            data = json.loads(body or b'{}')
+            self.relay.move(room, player_id, data.get('from'), data.get('to'))
+        except RelayError as e:
+            return self._error(e.status, str(e))
+        except (ValueError, AttributeError):
+            return self._error(400, 'Некорректный JSON')
+        return 200, room.snapshot()
+
+    async def matchmaking(self, action: Optional[str], player_id: int, body: bytes) -> Tuple[int, bytes]:
+        relay = self.relay
+        if action is None:
+            status = await relay.match_status(player_id, self.poll_timeout)
+            return 200, json.dumps(status, ensure_ascii=False).encode()
+
+        if action == 'leave':
+            left = relay.matchmaking.leave(player_id)
+            return 200, json.dumps({'left': left, **relay.matchmaking.status(player_id)}, ensure_ascii=False).encode()
+
+        try:
+            data = json.loads(body or b'{}')
+            time_control = str(data.get('time_control', '')).strip()
+        except (ValueError, AttributeError):
+            return self._error(400, 'Некорректный JSON')
+        try:
+            bet_amount = int(data.get('bet_amount', 0))
+        except (TypeError, ValueError):
+            return self._error(400, 'Некорректная ставка')
+        if not time_control or len(time_control) > 10:
+            return self._error(400, 'Некорректный контроль времени')
+        if bet_amount < 0:
+            return self._error(400, 'Некорректная ставка')
+
+        try:
+            await relay.join(player_id, time_control, bet_amount)
+        except RelayError as e:
+            return self._error(e.status, str(e))
+        return 200, json.dumps(relay.matchmaking.status(player_id), ensure_ascii=False).encode()
+
+
+async def serve(host: str, port: int, relay: Relay) -> None:
+    server = await asyncio.start_server(RelayServer(relay).handle, host, port)
+    flusher = asyncio.ensure_future(relay.flush_loop())
+    matcher = asyncio.ensure_future(relay.match_loop())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        flusher.cancel()
+        matcher.cancel()
+        await relay.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Real-time dice-chess relay')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, Relay(PostgresStore())))
+
+
+if __name__ == '__main__':
+    main()
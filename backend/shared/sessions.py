@@ -0,0 +1,145 @@
+'''
+Token-to-player resolution shared by every authenticated function.
+
+Resolved tokens are kept in a bounded LRU for at most SESSION_CACHE_TTL
+seconds and never past the session's own expires_at. Unknown or expired
+tokens go to a separate, smaller LRU for SESSION_NEGATIVE_TTL seconds, so a
+flood of guessed tokens neither reaches Postgres nor evicts valid sessions.
+Signed tokens (see shared.tokens) bypass both caches and are verified in CPU.
+
+Logout drops the token from the handling instance's caches at once. Other
+warm instances learn of it through revoked_tokens, the list signed tokens
+already use: an opaque logout is listed there under a hash of the token
+(session_jti) until every cache entry made before it has expired, and a
+cache hit is only trusted if its hash is not in that list. Their lag is
+therefore REVOCATION_REFRESH seconds for either kind of token.
+'''
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+
+from shared.tokens import is_signed, revocations, verify
+
+
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', '10000'))
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', '60'))
+SESSION_NEGATIVE_SIZE = int(os.environ.get('SESSION_NEGATIVE_SIZE', '2000'))
+SESSION_NEGATIVE_TTL = float(os.environ.get('SESSION_NEGATIVE_TTL', '5'))
+
+
+class TTLCache:
+    '''Bounded LRU whose entries carry their own deadline.'''
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, deadline = entry
+            if deadline <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def session_jti(token: str) -> str:
+    '''revoked_tokens key for an opaque token; 32 characters, never a signed token's jti.'''
+    return 'o' + hashlib.sha256(token.encode()).hexdigest()[:31]
+
+
+class SessionResolver:
+    '''Resolves X-Auth-Token values to player ids through the two caches.'''
+
+    def __init__(
+        self,
+        maxsize: int = SESSION_CACHE_SIZE,
+        ttl: float = SESSION_CACHE_TTL,
+        negative_maxsize: int = SESSION_NEGATIVE_SIZE,
+        negative_ttl: float = SESSION_NEGATIVE_TTL,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.known = TTLCache(maxsize)
+        self.unknown = TTLCache(negative_maxsize)
+
+    def resolve(self, conn: Any, token: str) -> Optional[int]:
+        if is_signed(token):
+            claims = verify(token)
+            if not claims or revocations.is_revoked(conn, claims.jti):
+                return None
+            return claims.player_id
+
+        hit, player_id = self.known.get(token)
+        if hit:
+            if revocations.is_revoked(conn, session_jti(token)):
+                self.known.pop(token)
+                return None
+            return player_id
+        hit, _ = self.unknown.get(token)
+        if hit:
+            return None
+
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT player_id, EXTRACT(EPOCH FROM expires_at - CURRENT_TIMESTAMP)
+                   FROM sessions
+                   WHERE token = %s AND expires_at > CURRENT_TIMESTAMP""",
+                (token,)
+            )
+            row = cur.fetchone()
+
+        if not row:
+            self.unknown.put(token, None, self.negative_ttl)
+            return None
+
+        player_id, expires_in = row
+        self.known.put(token, player_id, min(self.ttl, float(expires_in)))
+        return player_id
+
+    def revoke(self, conn: Any, token: str) -> None:
+        '''Lists a logged-out opaque token for the other instances; the caller commits.'''
+        # Twice the cache TTL outlives any entry cached before the logout committed.
+        revocations.revoke(conn, session_jti(token), datetime.now() + timedelta(seconds=2 * self.ttl))
+        self.invalidate(token)
+
+    def invalidate(self, token: str) -> None:
+        self.known.pop(token)
+        self.unknown.pop(token)
+
+    def clear(self) -> None:
+        self.known.clear()
+        self.unknown.clear()
+
+
+sessions = SessionResolver()
@@ -0,0 +1,105 @@
+'''
+Stateless HMAC-signed session tokens with a compact revocation list.
+
+With SESSION_TOKEN_MODE=signed, auth issues tokens of the form
+s1.<player_id>.<expires_unix>.<jti>.<signature> that any function holding
+SESSION_SIGNING_KEY verifies without touching Postgres. Logged-out tokens
+are recorded by jti in revoked_tokens until they would have expired; each
+instance reloads that small set every REVOCATION_REFRESH seconds.
+shared.sessions lists logged-out opaque tokens there too. Opaque
+tokens from secrets.token_urlsafe never contain a dot, so both kinds can be
+accepted side by side while clients migrate.
+'''
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Any, FrozenSet, NamedTuple, Optional, Tuple
+
+from shared.lazy import Refreshing
+
+
+SESSION_TOKEN_MODE = os.environ.get('SESSION_TOKEN_MODE', 'opaque')
+SESSION_SIGNING_KEY = os.environ.get('SESSION_SIGNING_KEY', '')
+SESSION_LIFETIME = timedelta(days=30)
+REVOCATION_REFRESH = float(os.environ.get('REVOCATION_REFRESH', '10'))
+
+PREFIX = 's1'
+
+
+class SignedToken(NamedTuple):
+    player_id: int
+    expires_at: int
+    jti: str
+
+
+def signing_enabled() -> bool:
+    return SESSION_TOKEN_MODE == 'signed'
+
+
+def is_signed(token: str) -> bool:
+    return token.startswith(PREFIX + '.')
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(SESSION_SIGNING_KEY.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def issue(player_id: int) -> Tuple[str, datetime]:
+    if not SESSION_SIGNING_KEY:
+        raise RuntimeError('SESSION_SIGNING_KEY is not configured')
+    expires_at = datetime.now() + SESSION_LIFETIME
+    payload = f'{PREFIX}.{player_id}.{int(expires_at.timestamp())}.{secrets.token_hex(8)}'
+    return f'{payload}.{_signature(payload)}', expires_at
+
+
+def verify(token: str) -> Optional[SignedToken]:
+    if not SESSION_SIGNING_KEY or not is_signed(token):
+        return None
+    payload, _, signature = token.rpartition('.')
+    # compare_digest refuses non-ASCII str, and a header can carry anything.
+    if not hmac.compare_digest(signature.encode(), _signature(payload).encode()):
+        return None
+    try:
+        _, player_id, expires_at, jti = payload.split('.')
+        claims = SignedToken(int(player_id), int(expires_at), jti)
+    except ValueError:
+        return None
+    if claims.expires_at <= time.time():
+        return None
+    return claims
+
+
+class RevocationList:
+    '''In-process copy of the unexpired jti values in revoked_tokens.'''
+
+    def __init__(self, refresh_every: float = REVOCATION_REFRESH):
+        self._revoked = Refreshing(self.load, refresh_every)
+
+    @staticmethod
+    def load(conn: Any) -> FrozenSet[str]:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT jti FROM t_p26016213_dice_chess_website.revoked_tokens WHERE expires_at > CURRENT_TIMESTAMP"
+            )
+            return frozenset(row[0] for row in cur.fetchall())
+
+    def is_revoked(self, conn: Any, jti: str) -> bool:
+        return jti in self._revoked.get(conn)
+
+    def revoke(self, conn: Any, jti: str, expires_at: datetime) -> None:
+        with conn.cursor() as cur:
+            cur.execute(
+                """INSERT INTO t_p26016213_dice_chess_website.revoked_tokens (jti, expires_at)
+                   VALUES (%s, %s) ON CONFLICT (jti) DO NOTHING""",
+                (jti, expires_at)
+            )
+        self._revoked.update(lambda revoked: revoked | {jti})
+
+
+revocations = RevocationList()
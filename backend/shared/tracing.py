@@ -0,0 +1,171 @@
+'''
+Per-request tracing: phase timings, per-statement timings and row counts.
+
+Off unless TRACING_ENABLED=1. When it is off, the router never creates a
+Trace, the pool opens plain psycopg2 connections, and the remaining cost is a
+module-constant check per phase. When it is on, pooled connections come from
+traced_connection, whose cursors time every execute against the trace bound
+to the current thread. The router turns the finished trace into a
+Server-Timing header and one JSON log line on stdout, plus a slow_query line
+for every statement over SLOW_QUERY_MS. Phases may nest: a connect or
+serialize that happens inside the route is also part of handler.
+'''
+
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '0') == '1'
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SQL_PREVIEW = 200
+
+_local = threading.local()
+_whitespace = re.compile(r'\s+')
+
+
+class Statement(NamedTuple):
+    sql: str
+    ms: float
+    rows: int
+
+
+class Trace:
+    __slots__ = ('route', 'started', 'phases', 'statements', 'error')
+
+    def __init__(self, route: str = ''):
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.statements: List[Statement] = []
+        self.error: Optional[str] = None
+
+    def add(self, phase: str, started: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + (time.perf_counter() - started) * 1000
+
+    def statement(self, sql: Any, started: float, rows: int) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        if isinstance(sql, bytes):
+            sql = sql.decode('utf-8', 'replace')
+        self.statements.append(Statement(str(sql), ms, max(rows, 0)))
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms: float) -> str:
+        entries = [f'{phase};dur={ms:.1f}' for phase, ms in self.phases.items()]
+        if self.statements:
+            db_ms = sum(statement.ms for statement in self.statements)
+            entries.append(f'db;dur={db_ms:.1f};desc="{len(self.statements)} queries"')
+        entries.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(entries)
+
+    def annotate(self, response: Dict[str, Any], total_ms: float) -> Dict[str, Any]:
+        headers = {
+            **response.get('headers', {}),
+            'Server-Timing': self.server_timing(total_ms),
+            'Timing-Allow-Origin': '*'
+        }
+        return {**response, 'headers': headers}
+
+    def log(self, status: int, total_ms: float) -> None:
+        slow = [statement for statement in self.statements if statement.ms >= SLOW_QUERY_MS]
+        record = {
+            'trace': 'request',
+            'route': self.route,
+            'status': status,
+            'total_ms': round(total_ms, 2),
+            'phases': {phase: round(ms, 2) for phase, ms in self.phases.items()},
+            'db_ms': round(sum(statement.ms for statement in self.statements), 2),
+            'queries': len(self.statements),
+            'rows': sum(statement.rows for statement in self.statements),
+            'slow_queries': len(slow),
+        }
+        if self.error:
+            record['error'] = self.error
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+
+        for statement in slow:
+            print(json.dumps({
+                'trace': 'slow_query',
+                'route': self.route,
+                'ms': round(statement.ms, 2),
+                'rows': statement.rows,
+                'sql': _whitespace.sub(' ', statement.sql).strip()[:SQL_PREVIEW],
+            }, ensure_ascii=False), flush=True)
+
+
+def begin(route: str = '') -> Trace:
+    trace = Trace(route)
+    _local.trace = trace
+    return trace
+
+
+def end() -> None:
+    _local.trace = None
+
+
+def current() -> Optional[Trace]:
+    return getattr(_local, 'trace', None)
+
+
+@lru_cache(maxsize=1)
+def _classes() -> Tuple[Any, Any]:
+    from psycopg2 import extensions
+
+    class TracingCursor(extensions.cursor):
+        def execute(self, query: Any, vars: Any = None) -> Any:
+            trace = current()
+            if trace is None:
+                return super().execute(query, vars)
+            started = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                trace.statement(query, started, self.rowcount)
+
+        def executemany(self, query: Any, vars_list: Any) -> Any:
+            trace = current()
+            if trace is None:
+                return super().executemany(query, vars_list)
+            started = time.perf_counter()
+            try:
+                return super().executemany(query, vars_list)
+            finally:
+                trace.statement(query, started, self.rowcount)
+
+    class TracingConnection(extensions.connection):
+        def cursor(self, *args: Any, **kwargs: Any) -> Any:
+            kwargs.setdefault('cursor_factory', TracingCursor)
+            return super().cursor(*args, **kwargs)
+
+        def commit(self) -> None:
+            trace = current()
+            if trace is None or self.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE:
+                return super().commit()
+            started = time.perf_counter()
+            try:
+                super().commit()
+            finally:
+                trace.statement('COMMIT', started, 0)
+
+        def rollback(self) -> None:
+            trace = current()
+            if trace is None or self.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE:
+                return super().rollback()
+            started = time.perf_counter()
+            try:
+                super().rollback()
+            finally:
+                trace.statement('ROLLBACK', started, 0)
+
+    return TracingConnection, TracingCursor
+
+
+def traced_connection(dsn: str, *args: Any, **kwargs: Any) -> Any:
+    '''connection_factory for psycopg2.connect; psycopg2 is imported on first use.'''
+    return _classes()[0](dsn, *args, **kwargs)
@@ -0,0 +1,39 @@
+-- Гистограмма рейтингов для вычисления места игрока без COUNT(*) по players
+CREATE TABLE IF NOT EXISTS t_p26016213_dice_chess_website.rating_histogram (
+    rating INTEGER PRIMARY KEY,
+    players INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO t_p26016213_dice_chess_website.rating_histogram (rating, players)
+SELECT rating, COUNT(*) FROM t_p26016213_dice_chess_website.players
+WHERE rating IS NOT NULL
+GROUP BY rating
+ON CONFLICT (rating) DO UPDATE SET players = EXCLUDED.players;
+
+-- Инкрементальное обновление гистограммы при изменении рейтинга
+CREATE OR REPLACE FUNCTION t_p26016213_dice_chess_website.sync_rating_histogram() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.rating IS NOT DISTINCT FROM NEW.rating THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.rating IS NOT NULL THEN
+        UPDATE t_p26016213_dice_chess_website.rating_histogram
+        SET players = players - 1
+        WHERE rating = OLD.rating;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.rating IS NOT NULL THEN
+        INSERT INTO t_p26016213_dice_chess_website.rating_histogram (rating, players)
+        VALUES (NEW.rating, 1)
+        ON CONFLICT (rating) DO UPDATE
+        SET players = t_p26016213_dice_chess_website.rating_histogram.players + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_players_rating_histogram
+AFTER INSERT OR DELETE OR UPDATE OF rating ON t_p26016213_dice_chess_website.players
+FOR EACH ROW EXECUTE FUNCTION t_p26016213_dice_chess_website.sync_rating_histogram();
@@ -0,0 +1,8 @@
+-- Список отозванных подписанных токенов (хранится до истечения токена)
+CREATE TABLE IF NOT EXISTS t_p26016213_dice_chess_website.revoked_tokens (
+    jti VARCHAR(32) PRIMARY KEY,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON t_p26016213_dice_chess_website.revoked_tokens(expires_at);
@@ -0,0 +1,3 @@
+-- Бинарный журнал ходов партии (формат shared/movelog.py)
+ALTER TABLE t_p26016213_dice_chess_website.games
+ADD COLUMN IF NOT EXISTS move_log BYTEA;
@@ -0,0 +1,2 @@
+-- Составной индекс для keyset-пагинации таблицы лидеров по (rating, id)
+CREATE INDEX IF NOT EXISTS idx_players_rating_id ON t_p26016213_dice_chess_website.players(rating DESC, id DESC);
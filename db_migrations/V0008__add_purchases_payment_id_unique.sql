@@ -0,0 +1,2 @@
+-- Уникальный индекс для поиска покупки по payment_id в вебхуке оплаты
+CREATE UNIQUE INDEX IF NOT EXISTS idx_purchases_payment_id ON t_p26016213_dice_chess_website.purchases(payment_id);
@@ -0,0 +1,39 @@
+-- Счётчик побед в блиц-партиях для достижения blitz_wins (оценка длительности base + 40 * increment от 3 до 8 минут)
+ALTER TABLE t_p26016213_dice_chess_website.players
+ADD COLUMN IF NOT EXISTS blitz_wins INTEGER DEFAULT 0;
+
+UPDATE t_p26016213_dice_chess_website.players p
+SET blitz_wins = w.wins
+FROM (
+    SELECT winner_id, COUNT(*) AS wins
+    FROM t_p26016213_dice_chess_website.games
+    WHERE status = 'finished'
+      AND winner_id IS NOT NULL
+      AND time_control ~ '^[0-9]+\+[0-9]+$'
+      AND split_part(time_control, '+', 1)::int * 60 + split_part(time_control, '+', 2)::int * 40 BETWEEN 180 AND 479
+    GROUP BY winner_id
+) w
+WHERE p.id = w.winner_id;
+
+-- Начальный прогресс достижений по текущим счётчикам игроков
+INSERT INTO t_p26016213_dice_chess_website.player_achievements (player_id, achievement_id, progress, unlocked, unlocked_at)
+SELECT p.id, a.id, LEAST(v.value, a.requirement_value), v.value >= a.requirement_value,
+       CASE WHEN v.value >= a.requirement_value THEN CURRENT_TIMESTAMP END
+FROM t_p26016213_dice_chess_website.players p
+CROSS JOIN t_p26016213_dice_chess_website.achievements a
+CROSS JOIN LATERAL (
+    SELECT COALESCE(CASE a.requirement_type
+        WHEN 'wins' THEN p.wins
+        WHEN 'win_streak' THEN p.best_win_streak
+        WHEN 'blitz_wins' THEN p.blitz_wins
+        WHEN 'tokens' THEN p.tokens
+        WHEN 'rating' THEN p.rating
+        WHEN 'total_games' THEN p.total_games
+    END, 0) AS value
+) v
+WHERE a.requirement_value IS NOT NULL
+  AND a.requirement_type IN ('wins', 'win_streak', 'blitz_wins', 'tokens', 'rating', 'total_games')
+ON CONFLICT (player_id, achievement_id) DO UPDATE
+SET progress = EXCLUDED.progress,
+    unlocked = EXCLUDED.unlocked,
+    unlocked_at = EXCLUDED.unlocked_at;
@@ -0,0 +1,9 @@
+-- Явный результат партии: winner_id равен NULL и при ничьей, и при победе бота, и у брошенной партии
+ALTER TABLE t_p26016213_dice_chess_website.games
+ADD COLUMN IF NOT EXISTS result VARCHAR(10);
+
+-- Старые партии заполняются только там, где результат однозначен; без победителя result остаётся NULL
+UPDATE t_p26016213_dice_chess_website.games
+SET result = CASE WHEN winner_id = player1_id THEN 'player1' ELSE 'player2' END
+WHERE status = 'finished' AND result IS NULL
+  AND winner_id IS NOT NULL AND winner_id IN (player1_id, player2_id);
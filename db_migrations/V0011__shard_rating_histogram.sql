@@ -0,0 +1,61 @@
+-- Шардирование гистограммы рейтингов: строки (rating, shard), число игроков с рейтингом = сумма players по шардам.
+-- Каждый оператор пишет в один случайный из 16 шардов, поэтому одновременные изменения одного рейтинга
+-- (например, 1000 у всех новых игроков) обычно не ждут одну и ту же строку; отдельный шард может уходить в минус.
+ALTER TABLE t_p26016213_dice_chess_website.rating_histogram
+ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0;
+
+ALTER TABLE t_p26016213_dice_chess_website.rating_histogram
+DROP CONSTRAINT IF EXISTS rating_histogram_pkey;
+
+ALTER TABLE t_p26016213_dice_chess_website.rating_histogram
+ADD PRIMARY KEY (rating, shard);
+
+-- Триггер уровня оператора: изменения всех строк суммируются по рейтингу и применяются одним INSERT
+-- в порядке рейтинга. Строчный триггер брал две строки (старый и новый рейтинг) в разном порядке
+-- у встречных изменений 1000 -> 1016 и 1016 -> 1000 и приводил к взаимоблокировкам.
+CREATE OR REPLACE FUNCTION t_p26016213_dice_chess_website.sync_rating_histogram() RETURNS TRIGGER AS $$
+DECLARE
+    target_shard SMALLINT := floor(random() * 16)::SMALLINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO t_p26016213_dice_chess_website.rating_histogram AS h (rating, shard, players)
+        SELECT rating, target_shard, COUNT(*) FROM new_rows
+        WHERE rating IS NOT NULL
+        GROUP BY rating ORDER BY rating
+        ON CONFLICT (rating, shard) DO UPDATE SET players = h.players + EXCLUDED.players;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO t_p26016213_dice_chess_website.rating_histogram AS h (rating, shard, players)
+        SELECT rating, target_shard, -COUNT(*) FROM old_rows
+        WHERE rating IS NOT NULL
+        GROUP BY rating ORDER BY rating
+        ON CONFLICT (rating, shard) DO UPDATE SET players = h.players + EXCLUDED.players;
+    ELSE
+        INSERT INTO t_p26016213_dice_chess_website.rating_histogram AS h (rating, shard, players)
+        SELECT rating, target_shard, SUM(delta) FROM (
+            SELECT rating, -1 AS delta FROM old_rows WHERE rating IS NOT NULL
+            UNION ALL
+            SELECT rating, 1 FROM new_rows WHERE rating IS NOT NULL
+        ) changes
+        GROUP BY rating HAVING SUM(delta) <> 0 ORDER BY rating
+        ON CONFLICT (rating, shard) DO UPDATE SET players = h.players + EXCLUDED.players;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_players_rating_histogram ON t_p26016213_dice_chess_website.players;
+
+CREATE TRIGGER trg_players_rating_histogram_insert
+AFTER INSERT ON t_p26016213_dice_chess_website.players
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION t_p26016213_dice_chess_website.sync_rating_histogram();
+
+CREATE TRIGGER trg_players_rating_histogram_update
+AFTER UPDATE ON t_p26016213_dice_chess_website.players
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION t_p26016213_dice_chess_website.sync_rating_histogram();
+
+CREATE TRIGGER trg_players_rating_histogram_delete
+AFTER DELETE ON t_p26016213_dice_chess_website.players
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION t_p26016213_dice_chess_website.sync_rating_histogram();